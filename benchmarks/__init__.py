@@ -0,0 +1 @@
+"""Бенчмарки: заглушка API hh.ru, генератор синтетических данных и замеры производительности."""
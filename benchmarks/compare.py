@@ -0,0 +1,38 @@
+import argparse
+import json
+from typing import Any, Dict
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """Читает файл результатов бенчмарков."""
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> str:
+    """Сравнивает медианы одинаковых бенчмарков двух запусков; изменение > 1 означает замедление."""
+    baseline = {(result["scale"], result["name"]): result for result in previous["results"]}
+    lines = [f"{'Бенчмарк':<50} {'было, мс':>12} {'стало, мс':>12} {'изменение':>10}"]
+    for result in current["results"]:
+        old = baseline.get((result["scale"], result["name"]))
+        if old is None or not old["median"]:
+            continue
+        ratio = result["median"] / old["median"]
+        lines.append(
+            f"{result['scale'] + ' ' + result['name']:<50} "
+            f"{old['median'] * 1000:>12.1f} {result['median'] * 1000:>12.1f} {ratio:>9.2f}x"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """Сравнивает два файла результатов из командной строки."""
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарков двух версий")
+    parser.add_argument("previous", help="результаты базовой версии")
+    parser.add_argument("current", help="результаты новой версии")
+    args = parser.parse_args()
+    print(compare(load_results(args.previous), load_results(args.current)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from benchmarks.compare import compare, load_results
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic import SCALES, VACANCY_ID_BASE, SyntheticDataset
+from src.companies_and_vacancies import DBManager
+from src.database import (
+    ensure_schema,
+    populate_employers_table,
+    populate_vacancies_table,
+)
+from src.db_connection import BACKENDS, DBConnection, create_connection
+from src.db_queries import DBQueries
+from src.export import export_vacancies
+from src.get_vacancies import VacancyFetcher, get_session, is_valid_vacancy
+from src.models import Employer, Vacancy
+from src.pipeline import IngestPipeline
+from src.query_cache import bump_generation
+from src.request_scheduler import RequestScheduler
+from src.salary_analytics import SalaryAnalytics
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+GROUPS = ("fetch", "ingest", "pipeline", "queries", "analytics", "export")
+# Бенчмарки очищают таблицы, поэтому по умолчанию работают с отдельной базой
+DEFAULT_DATABASE = os.environ.get("BENCH_DB_NAME", "corpbase_bench")
+PROTECTED_DATABASES = {"companies_and_vacancies", "postgres"}
+VERSION_QUERIES = {
+    "postgresql": "SHOW server_version",
+    "sqlite": "SELECT sqlite_version()",
+    "duckdb": "SELECT version()",
+}
+
+
+def measure(
+    name: str,
+    scale: str,
+    func: Callable[[], int],
+    repeat: int,
+    setup: Callable[[], None] | None = None,
+    warmup: int = 0,
+) -> Dict[str, Any]:
+    """Запускает func repeat раз и возвращает сводку по времени.
+
+    func возвращает число обработанных строк; setup выполняется перед каждым запуском и не входит во время.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        func()
+    seconds = []
+    rows = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        rows = func()
+        seconds.append(time.perf_counter() - started)
+
+    median = statistics.median(seconds)
+    print(f"  {name}: медиана {median * 1000:.1f} мс, строк: {rows}")
+    return {
+        "name": name,
+        "scale": scale,
+        "repeat": repeat,
+        "rows": rows,
+        "seconds": seconds,
+        "min": min(seconds),
+        "median": median,
+        "mean": statistics.fmean(seconds),
+        "max": max(seconds),
+        "rows_per_second": rows / median if rows and median else None,
+    }
+
+
+class BenchmarkRunner:
+    """Бенчмарки загрузки из API, записи в БД и запросов DBManager на синтетических данных."""
+
+    def __init__(
+        self,
+        queries_manager: DBQueries,
+        repeat: int = 3,
+        workers: int = 8,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 42,
+        keyword: str = "Менеджер",
+    ):
+        """Инициализирует набор бенчмарков с параметрами заглушки API и числом повторов."""
+        self.queries_manager = queries_manager
+        self.repeat = repeat
+        self.workers = workers
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.keyword = keyword
+
+    def reset_tables(self) -> None:
+        """Очищает таблицы с данными, сохраняя схему."""
+        if self.queries_manager.dialect.embedded:
+            for table in ("vacancies", "employer_salary_stats", "employers"):
+                self.queries_manager.execute_query(f"DELETE FROM {table}", is_select=False)
+        else:
+            self.queries_manager.execute_query("TRUNCATE vacancies, employer_salary_stats, employers", is_select=False)
+        bump_generation()
+
+    def load(self, records: List[Vacancy]) -> None:
+        """Загружает набор в пустые таблицы и обновляет статистику планировщика PostgreSQL."""
+        self.reset_tables()
+        self._populate(records)
+        self.queries_manager.execute_query("ANALYZE", is_select=False)
+
+    def _populate(self, records: List[Vacancy]) -> int:
+        """Записывает вакансии через populate_vacancies_table; ошибка записи прерывает бенчмарк."""
+        status = populate_vacancies_table(records, self.queries_manager)
+        if status.startswith("Ошибка"):
+            raise RuntimeError(status)
+        return len(records)
+
+    def _populate_employers(self, employers: List[Employer]) -> int:
+        """Записывает работодателей через populate_employers_table."""
+        status = populate_employers_table(employers, self.queries_manager)
+        if status.startswith("Ошибка"):
+            raise RuntimeError(status)
+        return len(employers)
+
+    def _fetcher(self, server: StubServer) -> VacancyFetcher:
+        """Загрузчик без ограничения частоты и без кэша ответов: измеряется сам конвейер загрузки."""
+        scheduler = RequestScheduler(
+            session=get_session(self.workers), rate=1_000_000, max_concurrency=self.workers, cache=None
+        )
+        return VacancyFetcher(max_workers=self.workers, scheduler=scheduler, api_url=server.url)
+
+    @staticmethod
+    def parse_records(dataset: SyntheticDataset) -> List[Vacancy]:
+        """Проверяет и превращает вакансии набора в записи Vacancy, как это делает загрузчик."""
+        return [Vacancy.from_api(vacancy) for vacancy in dataset.iter_vacancies() if is_valid_vacancy(vacancy)]
+
+    def bench_fetch(self, scale: str, dataset: SyntheticDataset, server: StubServer) -> List[Dict[str, Any]]:
+        """Загрузка всех страниц работодателей из заглушки API."""
+
+        def fetch() -> int:
+            fetcher = self._fetcher(server)
+            return sum(len(vacancies) for _, _, vacancies in fetcher.iter_pages(dataset.employer_ids, as_records=True))
+
+        return [measure("fetch.iter_pages", scale, fetch, self.repeat)]
+
+    def bench_ingest(self, scale: str, dataset: SyntheticDataset, records: List[Vacancy]) -> List[Dict[str, Any]]:
+        """Запись работодателей и вакансий в БД: в пустые таблицы и повторная синхронизация без изменений."""
+        employers = dataset.employers()
+        results = [
+            measure("ingest.parse_records", scale, lambda: len(self.parse_records(dataset)), self.repeat),
+            measure(
+                "ingest.populate_employers_table",
+                scale,
+                lambda: self._populate_employers(employers),
+                self.repeat,
+                setup=self.reset_tables,
+            ),
+            measure(
+                "ingest.populate_vacancies_table.cold",
+                scale,
+                lambda: self._populate(records),
+                self.repeat,
+                setup=self.reset_tables,
+            ),
+            measure("ingest.populate_vacancies_table.unchanged", scale, lambda: self._populate(records), self.repeat),
+        ]
+        return results
+
+    def bench_pipeline(self, scale: str, dataset: SyntheticDataset, server: StubServer) -> List[Dict[str, Any]]:
+        """Сквозная загрузка IngestPipeline: заглушка API -> очередь -> пакетная запись в пустые таблицы."""
+
+        def run_pipeline() -> int:
+            counts = IngestPipeline(self.queries_manager, fetcher=self._fetcher(server)).run(dataset.employer_ids)
+            return counts["inserted"] + counts["updated"] + counts["unchanged"]
+
+        return [measure("pipeline.run", scale, run_pipeline, self.repeat, setup=self.reset_tables)]
+
+    def query_benchmarks(self, manager: DBManager, dataset: SyntheticDataset) -> List[Tuple[str, Callable[[], int]]]:
+        """Возвращает (название, функция) для каждого запроса DBManager."""
+        middle = VACANCY_ID_BASE + dataset.count // 2
+        return [
+            ("get_companies_and_vacancies_count", lambda: len(manager.get_companies_and_vacancies_count())),
+            ("get_all_vacancies", lambda: len(manager.get_all_vacancies())),
+            ("get_avg_salary", lambda: 1 if manager.get_avg_salary() else 0),
+            ("get_vacancies_with_higher_salary", lambda: len(manager.get_vacancies_with_higher_salary())),
+            ("get_vacancies_with_keyword", lambda: len(manager.get_vacancies_with_keyword())),
+            ("search_vacancies", lambda: len(manager.search_vacancies(["менеджер", "продажи"], mode="or"))),
+            ("get_vacancies_page", lambda: len(manager.get_vacancies_page(middle, 100)[0])),
+            ("iter_all_vacancies", lambda: sum(1 for _ in manager.iter_all_vacancies())),
+            (
+                "iter_vacancies_with_higher_salary",
+                lambda: sum(1 for _ in manager.iter_vacancies_with_higher_salary()),
+            ),
+        ]
+
+    def bench_queries(self, scale: str, dataset: SyntheticDataset, records: List[Vacancy]) -> List[Dict[str, Any]]:
+        """Запросы DBManager без кэша результатов на заранее загруженном наборе."""
+        self.load(records)
+        manager = DBManager(self.keyword, self.queries_manager)
+        benchmarks = self.query_benchmarks(manager, dataset)
+
+        covered = {name for name, _ in benchmarks}
+        for name in dir(DBManager):
+            if not name.startswith("_") and callable(getattr(DBManager, name)) and name not in covered:
+                print(f"  Нет бенчмарка для DBManager.{name}")
+
+        return [measure(f"queries.{name}", scale, func, self.repeat, warmup=1) for name, func in benchmarks]
+
+    def analytics_benchmarks(self, analytics: SalaryAnalytics) -> List[Tuple[str, Callable[[], int]]]:
+        """Возвращает (название, функция) для каждого метода SalaryAnalytics."""
+        return [
+            ("summary", lambda: analytics.summary().count),
+            ("percentiles", lambda: len(analytics.percentiles([0.1, 0.5, 0.9, 0.99]))),
+            ("histogram", lambda: sum(item.count for item in analytics.histogram(bins=20))),
+            ("by_employer", lambda: len(analytics.by_employer())),
+            ("by_location", lambda: len(analytics.by_location())),
+            ("by_keyword", lambda: len(analytics.by_keyword(["менеджер", "разработчик", "аналитик"]))),
+        ]
+
+    def bench_analytics(self, scale: str, records: List[Vacancy]) -> List[Dict[str, Any]]:
+        """Методы SalaryAnalytics без кэша результатов на заранее загруженном наборе."""
+        self.load(records)
+        analytics = SalaryAnalytics(self.queries_manager)
+        benchmarks = self.analytics_benchmarks(analytics)
+
+        covered = {name for name, _ in benchmarks}
+        for name in dir(SalaryAnalytics):
+            if not name.startswith("_") and callable(getattr(SalaryAnalytics, name)) and name not in covered:
+                print(f"  Нет бенчмарка для SalaryAnalytics.{name}")
+
+        return [measure(f"analytics.{name}", scale, func, self.repeat, warmup=1) for name, func in benchmarks]
+
+    def bench_export(self, scale: str, records: List[Vacancy]) -> List[Dict[str, Any]]:
+        """Выгрузка всего набора во временные файлы каждого формата."""
+        self.load(records)
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            for file_name in ("vacancies.csv", "vacancies.csv.gz", "vacancies.jsonl.gz", "vacancies.parquet"):
+                path = os.path.join(directory, file_name)
+                name = f"export.{file_name.split('.', 1)[1]}"
+                try:
+                    results.append(
+                        measure(name, scale, lambda: export_vacancies(self.queries_manager, path), self.repeat)
+                    )
+                except ImportError as e:  # Parquet требует необязательного pyarrow
+                    print(f"  Пропуск {name}: {e}")
+        return results
+
+    def run_scale(self, scale: str, groups: List[str]) -> List[Dict[str, Any]]:
+        """Выполняет выбранные группы бенчмарков для одного масштаба данных."""
+        print(f"Масштаб {scale}:")
+        dataset = SyntheticDataset(SCALES[scale], seed=self.seed)
+        results: List[Dict[str, Any]] = []
+        with StubServer(dataset, latency=self.latency, error_rate=self.error_rate, seed=self.seed) as server:
+            if "fetch" in groups:
+                results.extend(self.bench_fetch(scale, dataset, server))
+            if "pipeline" in groups:
+                results.extend(self.bench_pipeline(scale, dataset, server))
+        if {"ingest", "queries", "analytics", "export"} & set(groups):
+            records = self.parse_records(dataset)
+            if "ingest" in groups:
+                results.extend(self.bench_ingest(scale, dataset, records))
+            if "queries" in groups:
+                results.extend(self.bench_queries(scale, dataset, records))
+            if "analytics" in groups:
+                results.extend(self.bench_analytics(scale, records))
+            if "export" in groups:
+                results.extend(self.bench_export(scale, records))
+        return results
+
+
+def ensure_database(name: str) -> None:
+    """Создаёт базу данных для бенчмарков, если её нет (CREATE DATABASE требует autocommit)."""
+    admin = DBConnection(min_size=0, max_size=1)
+    admin.database = "postgres"
+    conn = admin.acquire()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+            if cursor.fetchone() is None:
+                cursor.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        admin.release(conn, discard=True)
+        admin.close()
+
+
+def collect_meta(queries_manager: DBQueries, args: argparse.Namespace) -> Dict[str, Any]:
+    """Описание окружения запуска: версия кода, Python и базы данных, параметры бенчмарков."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(RESULTS_DIR),
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    database_version = queries_manager.execute_query(VERSION_QUERIES[queries_manager.dialect.name])
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "database": queries_manager.dialect.name,
+        "database_version": database_version[0][0] if database_version else None,
+        "params": {
+            "backend": args.backend,
+            "scales": args.scale,
+            "groups": args.only,
+            "repeat": args.repeat,
+            "workers": args.workers,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "seed": args.seed,
+        },
+    }
+
+
+def main():
+    """Запускает бенчмарки и сохраняет результаты в JSON."""
+    parser = argparse.ArgumentParser(description="Бенчмарки CorpBase на синтетических данных")
+    parser.add_argument("--scale", action="append", choices=SCALES, help="масштаб данных (можно повторять)")
+    parser.add_argument("--only", action="append", choices=GROUPS, help="группа бенчмарков (можно повторять)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8, help="параллельность загрузки из API")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа заглушки, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов заглушки 429/503")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=BACKENDS, default="postgresql")
+    parser.add_argument(
+        "--database", default=DEFAULT_DATABASE, help="отдельная база данных (для встроенных бэкендов — файл)"
+    )
+    parser.add_argument("--output", help="файл результатов (по умолчанию benchmarks/results/<время>.json)")
+    parser.add_argument("--compare", help="файл результатов предыдущей версии для сравнения")
+    args = parser.parse_args()
+    args.scale = args.scale or ["1k"]
+    args.only = args.only or list(GROUPS)
+
+    if args.database in PROTECTED_DATABASES:
+        parser.error(f"бенчмарки очищают таблицы и не запускаются на базе {args.database}")
+
+    load_dotenv()
+    if args.backend == "postgresql":
+        ensure_database(args.database)
+        db_connection = DBConnection()
+        db_connection.database = args.database
+    else:
+        db_connection = create_connection(args.backend, path=args.database)
+    queries_manager = DBQueries(db_connection)
+    try:
+        print(ensure_schema(queries_manager))
+        runner = BenchmarkRunner(queries_manager, args.repeat, args.workers, args.latency, args.error_rate, args.seed)
+        report = {"meta": collect_meta(queries_manager, args), "results": []}
+        for scale in args.scale:
+            report["results"].extend(runner.run_scale(scale, args.only))
+    finally:
+        queries_manager.close()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['meta']['git_commit'] or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {output}")
+
+    if args.compare:
+        print(compare(load_results(args.compare), report))
+
+
+if __name__ == "__main__":
+    main()
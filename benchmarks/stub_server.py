@@ -0,0 +1,171 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import SCALES, SyntheticDataset
+
+MAX_DEPTH = 2000  # Как и hh.ru, заглушка не отдаёт больше 2000 вакансий на запрос
+MAX_PER_PAGE = 100
+_EMPLOYER_PATH = re.compile(r"^/employers/(\d+)$")
+
+
+class StubServer:
+    """Локальная замена api.hh.ru для бенчмарков: /vacancies с пагинацией и /employers/{id}.
+
+    latency добавляет задержку к каждому ответу, error_rate задаёт долю ответов
+    429 (с Retry-After: 0) и 503, на которых проверяются повторы планировщика.
+    """
+
+    def __init__(
+        self,
+        dataset: SyntheticDataset,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        """Инициализирует заглушку; port=0 выбирает свободный порт."""
+        self.dataset = dataset
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """Базовый адрес заглушки для VacancyFetcher(api_url=...) или HH_API_URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+    def vacancies_page(self, query: dict) -> tuple[int, dict]:
+        """Формирует ответ /vacancies в формате hh.ru."""
+        try:
+            employer_id = query["employer_id"][0]
+            page = int(query.get("page", ["0"])[0])
+            per_page = int(query.get("per_page", ["20"])[0])
+        except (KeyError, ValueError):
+            return 400, {"errors": [{"type": "bad_argument"}]}
+        if per_page < 1 or per_page > MAX_PER_PAGE or page < 0 or (page + 1) * per_page > MAX_DEPTH:
+            return 400, {"errors": [{"type": "bad_argument", "value": "page"}]}
+
+        found = self.dataset.found(employer_id)
+        items = self.dataset.employer_vacancies(employer_id, page * per_page, (page + 1) * per_page)
+        return 200, {
+            "items": items,
+            "found": found,
+            "pages": -(-min(found, MAX_DEPTH) // per_page),
+            "page": page,
+            "per_page": per_page,
+        }
+
+    def _make_handler(self):
+        stub = self
+
+        class StubHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, как у настоящего API
+
+            def _send(self, status: int, payload: dict, headers: dict | None = None):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub._should_fail():
+                    if stub._random.random() < 0.5:
+                        self._send(429, {"errors": [{"type": "too_many_requests"}]}, {"Retry-After": "0"})
+                    else:
+                        self._send(503, {"errors": [{"type": "service_unavailable"}]})
+                    return
+
+                url = urlparse(self.path)
+                if url.path == "/vacancies":
+                    self._send(*stub.vacancies_page(parse_qs(url.query)))
+                    return
+                match = _EMPLOYER_PATH.match(url.path)
+                employer = stub.dataset.employer(match.group(1)) if match else None
+                if employer is None:
+                    self._send(404, {"errors": [{"type": "not_found"}]})
+                else:
+                    self._send(200, employer)
+
+            def log_message(self, format, *args):
+                pass
+
+        return StubHandler
+
+    def start(self) -> "StubServer":
+        """Запускает заглушку в фоновом потоке."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Обслуживает запросы в текущем потоке до прерывания (Ctrl+C)."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        """Останавливает заглушку."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    """Запускает заглушку из командной строки, например для main.py с HH_API_URL."""
+    parser = argparse.ArgumentParser(description="Локальная заглушка API hh.ru")
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 429/503")
+    parser.add_argument("--employer-ids", help="ID работодателей через запятую (по умолчанию синтетические)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    employer_ids = args.employer_ids.split(",") if args.employer_ids else None
+    dataset = SyntheticDataset(SCALES[args.scale], seed=args.seed, employer_ids=employer_ids)
+    server = StubServer(dataset, args.host, args.port, args.latency, args.error_rate, seed=args.seed)
+    print(f"Заглушка hh.ru: {server.url} ({dataset.count} вакансий, работодателей: {len(dataset.employer_ids)})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import random
+from typing import Any, Dict, Iterator, List
+
+from src.models import Employer
+
+# Масштабы наборов данных для бенчмарков
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+EMPLOYER_ID_BASE = 9_000_000
+VACANCY_ID_BASE = 100_000_000
+
+AREAS = [(1, "Москва"), (2, "Санкт-Петербург"), (88, "Казань"), (4, "Новосибирск"), (68, "Омск"), (90, "Томск")]
+TITLES = [
+    "Менеджер по продажам",
+    "Python разработчик",
+    "Аналитик данных",
+    "Бухгалтер",
+    "Водитель-экспедитор",
+    "Менеджер проектов",
+    "Инженер-программист",
+    "Оператор call-центра",
+]
+SUFFIXES = ["", ", удалённо", " (стажёр)", " (старший)"]
+
+
+class SyntheticDataset:
+    """Детерминированный набор синтетических вакансий в формате ответов hh.ru.
+
+    Вакансии не хранятся в памяти: каждая вычисляется по (seed, работодатель, позиция),
+    поэтому заглушка API может отдавать любую страницу набора масштаба 1M без его загрузки.
+    Доля invalid_share вакансий не проходит is_valid_vacancy (нет зарплаты или валюта не RUR).
+    """
+
+    def __init__(
+        self,
+        count: int,
+        employers: int | None = None,
+        seed: int = 42,
+        invalid_share: float = 0.1,
+        employer_ids: List[str] | None = None,
+    ):
+        """Инициализирует набор из count вакансий, равномерно распределённых между работодателями."""
+        if employer_ids:
+            self.employer_ids = [str(employer_id) for employer_id in employer_ids]
+        else:
+            # По умолчанию у работодателя около 1000 вакансий: меньше предела выдачи hh.ru в 2000
+            employers = employers or max(10, count // 1000)
+            self.employer_ids = [str(EMPLOYER_ID_BASE + index) for index in range(employers)]
+        self.count = count
+        self.seed = seed
+        self.invalid_share = invalid_share
+        self._index = {employer_id: index for index, employer_id in enumerate(self.employer_ids)}
+
+    def employer_size(self, employer_index: int) -> int:
+        """Количество вакансий работодателя."""
+        size, remainder = divmod(self.count, len(self.employer_ids))
+        return size + (1 if employer_index < remainder else 0)
+
+    def _offset(self, employer_index: int) -> int:
+        """Порядковый номер первой вакансии работодателя во всём наборе."""
+        size, remainder = divmod(self.count, len(self.employer_ids))
+        return employer_index * size + min(employer_index, remainder)
+
+    def found(self, employer_id: str) -> int:
+        """Количество вакансий работодателя по его ID (0 для неизвестного работодателя)."""
+        employer_index = self._index.get(str(employer_id))
+        return self.employer_size(employer_index) if employer_index is not None else 0
+
+    def employer_name(self, employer_index: int) -> str:
+        """Название синтетического работодателя."""
+        return f"Синтетическая компания {employer_index}"
+
+    def vacancy(self, employer_index: int, position: int) -> Dict[str, Any]:
+        """Возвращает вакансию работодателя в формате элемента items ответа /vacancies."""
+        number = self._offset(employer_index) + position
+        rng = random.Random(self.seed * 1_000_003 + number)
+        employer_id = self.employer_ids[employer_index]
+        vacancy_id = VACANCY_ID_BASE + number
+        area_id, area_name = AREAS[rng.randrange(len(AREAS))]
+
+        salary_from = rng.randrange(30, 300) * 1000 if rng.random() < 0.8 else None
+        salary_to = (salary_from or 30_000) + rng.randrange(0, 150) * 1000 if rng.random() < 0.7 else None
+        salary = {"from": salary_from, "to": salary_to, "currency": "RUR", "gross": False}
+        if rng.random() < self.invalid_share:
+            salary = None if rng.random() < 0.5 else {**salary, "currency": "USD"}
+
+        return {
+            "id": str(vacancy_id),
+            "name": f"{rng.choice(TITLES)}{rng.choice(SUFFIXES)}",
+            "area": {"id": str(area_id), "name": area_name},
+            "salary": salary,
+            "published_at": f"2026-09-{rng.randrange(1, 31):02d}T{rng.randrange(24):02d}:00:00+0300",
+            "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+            "employer": {
+                "id": employer_id,
+                "name": self.employer_name(employer_index),
+                "alternate_url": f"https://hh.ru/employer/{employer_id}",
+            },
+        }
+
+    def employer_vacancies(self, employer_id: str, start: int = 0, stop: int | None = None) -> List[Dict[str, Any]]:
+        """Возвращает срез вакансий работодателя (пустой список для неизвестного работодателя)."""
+        employer_index = self._index.get(str(employer_id))
+        if employer_index is None:
+            return []
+        size = self.employer_size(employer_index)
+        stop = size if stop is None else min(stop, size)
+        return [self.vacancy(employer_index, position) for position in range(start, stop)]
+
+    def iter_vacancies(self) -> Iterator[Dict[str, Any]]:
+        """Лениво выдаёт все вакансии набора."""
+        for employer_index in range(len(self.employer_ids)):
+            for position in range(self.employer_size(employer_index)):
+                yield self.vacancy(employer_index, position)
+
+    def employer(self, employer_id: str) -> Dict[str, Any] | None:
+        """Возвращает работодателя в формате ответа /employers/{id}."""
+        employer_index = self._index.get(str(employer_id))
+        if employer_index is None:
+            return None
+        return {
+            "id": str(employer_id),
+            "name": self.employer_name(employer_index),
+            "alternate_url": f"https://hh.ru/employer/{employer_id}",
+            "open_vacancies": self.employer_size(employer_index),
+        }
+
+    def employers(self) -> List[Employer]:
+        """Возвращает всех работодателей набора в виде записей Employer."""
+        return [Employer.from_api(self.employer(employer_id)) for employer_id in self.employer_ids]
@@ -1,67 +1,117 @@
+import argparse
+import os
+
 from dotenv import load_dotenv
 
 from src.companies_and_vacancies import DBManager
-from src.database import (create_database, populate_employers_table,
-                          populate_vacancies_table, setup_employers_table,
-                          setup_vacancies_table)
-from src.db_connection import DBConnection
+from src.database import create_database, ensure_schema
+from src.db_connection import create_connection
 from src.db_queries import DBQueries
-from src.get_vacancies import (fetch_employer_name,
-                               fetch_vacancies_for_specific_employers)
+from src.employer_sets import load_employer_ids
+from src.get_vacancies import VacancyFetcher
+from src.metrics import start_from_env, write_from_env
+from src.pipeline import IngestPipeline
+from src.sharded_ingest import ShardCoordinator
+from src.snapshots import SnapshotArchive, SnapshotFetcher
 
 
 def main():
     """Основная функция для выполнения рабочего процесса программы."""
+    parser = argparse.ArgumentParser(description="Загрузка вакансий hh.ru в базу данных и отчёты по ним")
+    parser.add_argument(
+        "--replay",
+        nargs="?",
+        const="latest",
+        metavar="RUN",
+        help="перестроить базу из снимка прогона RUN (по умолчанию последнего) без обращения к hh.ru",
+    )
+    parser.add_argument(
+        "--employers",
+        metavar="SOURCE",
+        help="набор работодателей: файл (JSON, CSV или список ID) или db — все из таблицы employers",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="число процессов загрузки; больше 1 — загрузка шардами"
+    )
+    parser.add_argument("--shard-size", type=int, default=50, help="работодателей в шарде")
+    parser.add_argument(
+        "--resume", action="store_true", help="продолжить прерванную загрузку шардами с незавершённых шардов"
+    )
+    args = parser.parse_args()
     load_dotenv()
-    #  Подключение к базе данных
-    db_connection = DBConnection()
+    # Эндпоинт /metrics (METRICS_PORT) и файл метрик (METRICS_FILE) включаются переменными окружения
+    start_from_env()
+    #  Подключение к базе данных: PostgreSQL или встроенная SQLite/DuckDB (DB_BACKEND)
+    db_connection = create_connection()
     db_queries = DBQueries(db_connection)
 
     # Создание базы данных (если она не существует)
     create_database(db_queries)
 
-    # Настройка и заполнение таблицы работодателей
-    print(setup_employers_table(db_queries))
-
-    # Список ID конкретных работодателей
-    specific_employer_ids = [
-        "80",
-        "1740",
-        "2460946",
-        "15478",
-        "4233",
-        "59",
-        "1102601",
-        "208707",
-        "1373",
-        "106571",
-    ]
-
-    # Получаем данные о работодателях по их ID
-    employers_data = []
-    for employer_id in specific_employer_ids:
-        employer_name = fetch_employer_name(employer_id)
-        if employer_name:
-            employers_data.append({"name": employer_name, "open_vacancies": "N/A"})
-        else:
-            print(f"Не удалось получить имя для работодателя с ID {employer_id}")
+    # Создание таблиц (DDL пропускается, если схема уже актуальна)
+    print(ensure_schema(db_queries))
 
-    print(populate_employers_table(employers_data, db_queries))
+    # Набор работодателей: --employers, переменная окружения HH_EMPLOYERS или набор по умолчанию
+    try:
+        specific_employer_ids = load_employer_ids(args.employers, db_queries)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка чтения набора работодателей: {e}")
+        db_queries.close()
+        return
 
-    # Настройка и заполнение таблицы вакансий
-    print(setup_vacancies_table(db_queries))
+    if args.replay:
+        # Повтор загрузки из архива: те же работодатели и ответы API, что и в исходном прогоне
+        try:
+            fetcher = SnapshotFetcher(args.replay)
+        except FileNotFoundError as e:
+            print(e)
+            db_queries.close()
+            return
+        specific_employer_ids = fetcher.employer_ids
+        print(f"Воспроизведение снимка {fetcher.run_id}")
+    else:
+        # Исходные ответы hh.ru сохраняются в архив снимков (HH_SNAPSHOT_DIR), если он не отключён
+        archive = None if os.environ.get("HH_SNAPSHOTS_DISABLED") else SnapshotArchive()
+        fetcher = VacancyFetcher(archive=archive)
 
-    vacancies_data = fetch_vacancies_for_specific_employers(specific_employer_ids)
-
-    print(populate_vacancies_table(vacancies_data, db_queries))
+    if args.workers > 1 and not args.replay:
+        # Загрузка шардами в пуле процессов, каждый со своим подключением к базе
+        loader = ShardCoordinator(db_queries, workers=args.workers, shard_size=args.shard_size, archive=archive)
+        counts = loader.run(specific_employer_ids, resume=args.resume)
+    else:
+        # Потоковая инкрементальная синхронизация таблицы вакансий:
+        # страницы записываются в базу пакетами по мере загрузки,
+        # а данные о работодателях берутся из самих вакансий
+        loader = IngestPipeline(db_queries, fetcher=fetcher)
+        counts = loader.run(specific_employer_ids)
+    print(
+        "Вакансии синхронизированы с таблицей 'vacancies': "
+        f"добавлено {counts['inserted']}, обновлено {counts['updated']}, "
+        f"без изменений {counts['unchanged']}, удалено {counts['deleted']}."
+    )
+    print(loader.report())
 
     obj = DBManager("Менеджер", db_queries)
 
-    print("\nКомпании и количество вакансий:", obj.get_companies_and_vacancies_count())
-    print("Все вакансии:", obj.get_all_vacancies())
+    # Записи преобразуются в словари только для вывода
+    print(
+        "\nКомпании и количество вакансий:",
+        [employer.to_dict() for employer in obj.get_companies_and_vacancies_count()],
+    )
+    print("Все вакансии:", [vacancy.to_dict() for vacancy in obj.get_all_vacancies()])
     print("Средняя зарплата:", obj.get_avg_salary())
-    print("Вакансии с зарплатой выше средней:", obj.get_vacancies_with_higher_salary())
-    print("Вакансии с ключевым словом 'Менеджер':", obj.get_vacancies_with_keyword())
+    print(
+        "Вакансии с зарплатой выше средней:",
+        [vacancy.to_dict() for vacancy in obj.get_vacancies_with_higher_salary()],
+    )
+    print(
+        "Вакансии с ключевым словом 'Менеджер':",
+        [vacancy.to_dict() for vacancy in obj.get_vacancies_with_keyword()],
+    )
+
+    # Закрываем пул подключений
+    db_queries.close()
+    write_from_env()
 
 
 if __name__ == "__main__":
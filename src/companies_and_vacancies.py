@@ -1,4 +1,40 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
+
+from src.models import Employer, Vacancy
+from src.query_cache import QueryCache, cached_query
+
+# Порядок полей совпадает с полями src.models.Vacancy
+VACANCY_FIELDS = """
+    v.vacancy_id, v.employer_id, v.name_vacancy, e.name, v.area_id, v.location,
+    v.salary_from, v.salary_to, v.currency, v.url, v.published_at, e.url
+"""
+
+# Название компании хранится в employers; соединение идёт по целочисленному ключу
+VACANCIES_FROM = "vacancies v JOIN employers e ON e.employer_id = v.employer_id"
+
+SEARCH_OPERATORS = {"and": " && ", "or": " || "}
+
+# Наибольший размер страницы get_vacancies_page
+MAX_PAGE_SIZE = 1000
+
+# Средняя зарплата из материализованных агрегатов (по вакансиям с обеими границами вилки);
+# {total} — SUM(salary_sum), приведённая к дробному типу диалекта (см. src.dialects)
+AVG_SALARY_QUERY = """
+    SELECT ROUND({total} / NULLIF(SUM(salaried_count), 0), 2)
+    FROM employer_salary_stats
+"""
+
+HIGHER_SALARY_CONDITION = """
+    salary_from > 0 AND salary_to > 0
+    AND {midpoint} > ({avg_salary_query})
+"""
+
+
+def like_pattern(keyword: str) -> str:
+    """Шаблон LIKE для поиска подстроки: спецсимволы экранируются, чтобы слово искалось буквально."""
+    keyword = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{keyword}%"
 
 
 class DataFetcher(ABC):
@@ -33,92 +69,162 @@ class DataFetcher(ABC):
 class DBManager(DataFetcher):
     """Управляет взаимодействием с базой данных для получения информации о компаниях и вакансиях."""
 
-    def __init__(self, keyword: str, queries_manager):
-        """Инициализирует DBManager с ключевым словом и экземпляром DBQueries."""
+    def __init__(self, keyword: str, queries_manager, cache: QueryCache | None = None):
+        """Инициализирует DBManager с ключевым словом, экземпляром DBQueries и необязательным кэшем результатов.
+
+        Кэш сбрасывается при каждой успешной загрузке данных (см. src.query_cache.bump_generation).
+        """
         self.keyword = keyword
         self.queries_manager = queries_manager
-
-    def get_companies_and_vacancies_count(self) -> list:
+        self.cache = cache
+        dialect = queries_manager.dialect
+        self.avg_salary_query = AVG_SALARY_QUERY.format(total=dialect.decimal("SUM(salary_sum)"))
+        self.higher_salary_condition = HIGHER_SALARY_CONDITION.format(
+            midpoint=dialect.int_div("salary_from + salary_to", "2"), avg_salary_query=self.avg_salary_query
+        )
+
+    @cached_query
+    def get_companies_and_vacancies_count(self) -> list[Employer]:
         """Получает список компаний и количество вакансий у каждой компании."""
         query = """
-                SELECT v.employer, COUNT(v.name_vacancy)
-                FROM vacancies v
-                GROUP BY v.employer
+                SELECT e.employer_id, e.name, s.vacancies_count, e.url
+                FROM employer_salary_stats s
+                JOIN employers e ON e.employer_id = s.employer_id
                 """
         results = self.queries_manager.execute_query(query)
-        return results
+        return [Employer._make(row) for row in results]
 
-    def get_all_vacancies(self) -> list[dict[str, str]]:
+    @cached_query
+    def get_all_vacancies(self) -> list[Vacancy]:
         """Получает список всех вакансий с указанием названия компании, названия вакансии, зарплаты и ссылки на вакансию."""
-        query = """
-            SELECT v.name_vacancy, v.employer, v.salary_from, v.salary_to, v.currency, v.url
-            FROM vacancies v
+        query = f"""
+            SELECT {VACANCY_FIELDS}
+            FROM {VACANCIES_FROM}
         """
         results = self.queries_manager.execute_query(query)
-        vacancies = []
-        for row in results:
-            vacancies.append(
-                {
-                    "Компания": row[1],
-                    "Вакансия": row[0],
-                    "Зарплата": f"{row[2]} - {row[3]} {row[4]}",
-                    "URL": row[5],
-                }
-            )
-        return vacancies
+        return [Vacancy._make(row) for row in results]
 
+    @cached_query
     def get_avg_salary(self) -> str:
         """Получает среднюю зарплату по вакансиям."""
-        query = """
-            SELECT ROUND(AVG((salary_from + salary_to) / 2), 2) AS avg_salary
-            FROM vacancies
-            WHERE salary_to > 0 AND salary_from > 0
-        """
-        results = self.queries_manager.execute_query(query)
+        results = self.queries_manager.execute_query(self.avg_salary_query)
         avg_salary = results[0][0] if results and results[0] else None
         return f"Средняя зарплата: {float(avg_salary) if avg_salary else 'N/A'}"
 
-    def get_vacancies_with_higher_salary(self) -> list[dict[str, str]]:
-        """Получает список вакансий, у которых зарплата выше средней по всем вакансиям."""
-        query = """
-            SELECT v.name_vacancy, v.employer, v.salary_from, v.salary_to, v.currency, v.url
-            FROM vacancies v
-            WHERE (salary_from + salary_to) / 2 > (
-                SELECT AVG((salary_from + salary_to) / 2) FROM vacancies
-            )
+    @cached_query
+    def get_vacancies_with_higher_salary(self) -> list[Vacancy]:
+        """Получает список вакансий, у которых зарплата выше средней (вакансии с обеими границами вилки)."""
+        query = f"""
+            SELECT {VACANCY_FIELDS}
+            FROM {VACANCIES_FROM}
+            WHERE {self.higher_salary_condition}
         """
         results = self.queries_manager.execute_query(query)
-        vacancies = []
-        for row in results:
-            vacancies.append(
-                {
-                    "Компания": row[1],
-                    "Вакансия": row[0],
-                    "Зарплата": f"{row[2]} - {row[3]} {row[4]}",
-                    "URL": row[5],
-                }
-            )
-        return vacancies
-
-    def get_vacancies_with_keyword(self) -> list[dict[str, str]]:
+        return [Vacancy._make(row) for row in results]
+
+    def iter_all_vacancies(self, batch_size: int = 1000) -> Iterator[Vacancy]:
+        """Лениво выдаёт все вакансии, читая их серверным курсором порциями по batch_size."""
+        query = f"""
+            SELECT {VACANCY_FIELDS}
+            FROM {VACANCIES_FROM}
+        """
+        for row in self.queries_manager.stream_query(query, batch_size=batch_size):
+            yield Vacancy._make(row)
+
+    def iter_vacancies_with_higher_salary(self, batch_size: int = 1000) -> Iterator[Vacancy]:
+        """Лениво выдаёт вакансии с зарплатой выше средней, читая их серверным курсором."""
+        query = f"""
+            SELECT {VACANCY_FIELDS}
+            FROM {VACANCIES_FROM}
+            WHERE {self.higher_salary_condition}
+        """
+        for row in self.queries_manager.stream_query(query, batch_size=batch_size):
+            yield Vacancy._make(row)
+
+    @cached_query
+    def get_vacancies_page(
+        self, after: int | None = None, limit: int = 100
+    ) -> tuple[list[Vacancy], int | None]:
+        """Возвращает страницу вакансий после ключа after (keyset-пагинация по ID вакансии).
+
+        Вторым элементом возвращается ключ для следующей страницы или None, если страниц больше нет.
+        Время ответа не зависит от глубины страницы: поиск идёт по первичному ключу.
+        Размер страницы limit — от 1 до MAX_PAGE_SIZE.
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"Размер страницы должен быть от 1 до {MAX_PAGE_SIZE}: {limit}")
+        condition = "WHERE v.vacancy_id > %s" if after is not None else ""
+        query = f"""
+            SELECT {VACANCY_FIELDS}
+            FROM {VACANCIES_FROM}
+            {condition}
+            ORDER BY v.vacancy_id
+            LIMIT %s
+        """
+        params = (after, limit) if after is not None else (limit,)
+        results = self.queries_manager.execute_query(query, params, prepare=True)
+        vacancies = [Vacancy._make(row) for row in results]
+        next_after = vacancies[-1].vacancy_id if vacancies and len(vacancies) == limit else None
+        return vacancies, next_after
+
+    @cached_query
+    def get_vacancies_with_keyword(self) -> list[Vacancy]:
         """получает список всех вакансий, в названии которых содержатся переданные в метод слова."""
         query = f"""
-            SELECT v.name_vacancy, v.employer, v.salary_from, v.salary_to, v.currency, v.url
-            FROM vacancies v
-            WHERE name_vacancy ILIKE '%{self.keyword}%'
+            SELECT {VACANCY_FIELDS}
+            FROM {VACANCIES_FROM}
+            WHERE {self.queries_manager.dialect.ilike("name_vacancy")}
         """
-        results = self.queries_manager.execute_query(query)
-        vacancies = []
-        for row in results:
-            vacancies.append(
-                {
-                    "Компания": row[1],
-                    "Вакансия": row[0],
-                    "Зарплата": f"{row[2]} - {row[3]} {row[4]}",
-                    "URL": row[5],
-                }
-            )
-        return vacancies
+        results = self.queries_manager.execute_query(query, (like_pattern(self.keyword),), prepare=True)
+        return [Vacancy._make(row) for row in results]
+
+    @cached_query
+    def search_vacancies(
+        self, keywords: list[str], mode: str = "and", limit: int = 50
+    ) -> list[Vacancy]:
+        """Полнотекстовый поиск вакансий по словам с учётом русской морфологии.
+
+        mode="and" требует всех слов, mode="or" — хотя бы одного. Результаты
+        упорядочены по релевантности (ts_rank) и ограничены limit.
+        """
+        if mode not in SEARCH_OPERATORS:
+            raise ValueError(f"Неизвестный режим поиска: {mode}")
+        keywords = [keyword for keyword in keywords if keyword.strip()]
+        if not keywords:
+            return []
+        if not self.queries_manager.dialect.full_text_search:
+            return self._search_substring(keywords, mode, limit)
+
+        tsquery = SEARCH_OPERATORS[mode].join(["plainto_tsquery('russian', %s)"] * len(keywords))
+        query = f"""
+            SELECT {VACANCY_FIELDS}
+            FROM {VACANCIES_FROM}
+            CROSS JOIN LATERAL (SELECT {tsquery} AS query) q
+            WHERE v.search_vector @@ q.query
+            ORDER BY ts_rank(v.search_vector, q.query) DESC, v.vacancy_id
+            LIMIT %s
+        """
+        results = self.queries_manager.execute_query(query, (*keywords, limit), prepare=True)
+        return [Vacancy._make(row) for row in results]
+
+    def _search_substring(self, keywords: list[str], mode: str, limit: int) -> list[Vacancy]:
+        """Поиск для бэкендов без полнотекстового индекса: подстроки без учёта регистра и морфологии.
+
+        Релевантность — число найденных слов.
+        """
+        ilike = self.queries_manager.dialect.ilike("v.name_vacancy")
+        matches = [f"CASE WHEN {ilike} THEN 1 ELSE 0 END" for _ in keywords]
+        patterns = [like_pattern(keyword) for keyword in keywords]
+        operator = " AND " if mode == "and" else " OR "
+        query = f"""
+            SELECT {VACANCY_FIELDS}
+            FROM {VACANCIES_FROM}
+            WHERE {operator.join([ilike] * len(keywords))}
+            ORDER BY {" + ".join(matches)} DESC, v.vacancy_id
+            LIMIT %s
+        """
+        results = self.queries_manager.execute_query(query, (*patterns, *patterns, limit))
+        return [Vacancy._make(row) for row in results]
 
 
 if __name__ == "__main__":
@@ -130,8 +236,17 @@ if __name__ == "__main__":
 
     obj = DBManager("Менеджер", local_queries_manager)
 
-    print("Компании и количество вакансий:", obj.get_companies_and_vacancies_count())
-    print("Все вакансии:", obj.get_all_vacancies())
+    print(
+        "Компании и количество вакансий:",
+        [employer.to_dict() for employer in obj.get_companies_and_vacancies_count()],
+    )
+    print("Все вакансии:", [vacancy.to_dict() for vacancy in obj.get_all_vacancies()])
     print("Средняя зарплата:", obj.get_avg_salary())
-    print("Вакансии с зарплатой выше средней:", obj.get_vacancies_with_higher_salary())
-    print("Вакансии с ключевым словом 'Менеджер':", obj.get_vacancies_with_keyword())
+    print(
+        "Вакансии с зарплатой выше средней:",
+        [vacancy.to_dict() for vacancy in obj.get_vacancies_with_higher_salary()],
+    )
+    print(
+        "Вакансии с ключевым словом 'Менеджер':",
+        [vacancy.to_dict() for vacancy in obj.get_vacancies_with_keyword()],
+    )
@@ -1,15 +1,146 @@
-from typing import Dict, List, Optional
+import hashlib
+import time
+from typing import Any, Dict, Iterable, List
 
+import psycopg2
 from dotenv import load_dotenv
 
-from src.db_connection import DBConnection
+from src.db_connection import create_connection
 from src.db_queries import DBQueries
-from src.get_vacancies import (fetch_employer_name,
-                               fetch_vacancies_for_specific_employers)
+from src.dialects import POSTGRESQL, Dialect
+from src.employer_sets import load_employer_ids
+from src.get_vacancies import fetch_vacancies_for_specific_employers
+from src.metrics import REGISTRY
+from src.models import Employer, Vacancy
+from src.query_cache import bump_generation
+
+# Версия схемы: при её изменении ensure_schema пересоздаёт таблицы, иначе DDL пропускается
+SCHEMA_VERSION = 5
+
+EMPLOYERS_DDL = """
+    CREATE TABLE IF NOT EXISTS employers (
+        employer_id INT PRIMARY KEY,
+        name varchar(255) not null,
+        url text,
+        open_vacancies INT
+    )
+"""
+
+VACANCIES_DDL = """
+    CREATE TABLE IF NOT EXISTS vacancies (
+        vacancy_id INT PRIMARY KEY,
+        employer_id INT not null REFERENCES employers(employer_id),
+        name_vacancy text not null,
+        area_id INT,
+        location varchar(100) not null,
+        salary_from INT not null,
+        salary_to INT not null,
+        currency varchar(10) not null,
+        url text not null,
+        published_at timestamptz,
+        content_hash char(32) not null,
+        synced_at timestamptz not null default now(),
+        search_vector tsvector GENERATED ALWAYS AS (to_tsvector('russian', name_vacancy)) STORED
+    )
+"""
+
+VACANCIES_INDEXES_DDL = [
+    # Полнотекстовый поиск по названию вакансии с русской морфологией
+    "CREATE INDEX IF NOT EXISTS vacancies_search_idx ON vacancies USING GIN (search_vector)",
+    # Соединение с employers и пересчёт агрегатов по работодателю при загрузке
+    "CREATE INDEX IF NOT EXISTS vacancies_employer_idx ON vacancies (employer_id)",
+    "CREATE INDEX IF NOT EXISTS vacancies_location_idx ON vacancies (location)",
+    # Поиск вакансий с зарплатой выше средней (учитываются только вакансии с обеими границами)
+    """
+    CREATE INDEX IF NOT EXISTS vacancies_salary_mid_idx ON vacancies (((salary_from + salary_to) / 2))
+    WHERE salary_from > 0 AND salary_to > 0
+    """,
+]
+
+# Материализованные агрегаты по работодателям; средняя зарплата считается по середине вилки
+# и только по вакансиям с обеими границами, как в DBManager.get_avg_salary
+SALARY_STATS_DDL = """
+    CREATE TABLE IF NOT EXISTS employer_salary_stats (
+        employer_id INT PRIMARY KEY REFERENCES employers(employer_id) ON DELETE CASCADE,
+        vacancies_count INT not null,
+        salaried_count INT not null,
+        salary_sum BIGINT not null,
+        salary_min INT,
+        salary_max INT
+    )
+"""
+
+# Триграммный индекс ускоряет поиск подстроки (ILIKE '%...%'); требует расширения pg_trgm
+TRIGRAM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS vacancies_name_trgm_idx ON vacancies USING GIN (name_vacancy gin_trgm_ops)",
+]
+
+# Схема встроенных бэкендов (SQLite, DuckDB): без tsvector и GIN-индексов, а также без внешних
+# ключей — DuckDB не позволяет обновлять строки employers, на которые ссылаются вакансии
+EMBEDDED_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS employers (
+        employer_id INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        url TEXT,
+        open_vacancies INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS vacancies (
+        vacancy_id INTEGER PRIMARY KEY,
+        employer_id INTEGER NOT NULL,
+        name_vacancy TEXT NOT NULL,
+        area_id INTEGER,
+        location VARCHAR(100) NOT NULL,
+        salary_from INTEGER NOT NULL,
+        salary_to INTEGER NOT NULL,
+        currency VARCHAR(10) NOT NULL,
+        url TEXT NOT NULL,
+        published_at {timestamp},
+        content_hash CHAR(32) NOT NULL,
+        synced_at {timestamp} NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Агрегаты пересчитываются удалением и вставкой в одной транзакции, а DuckDB в этом случае
+    # ошибочно сообщает о нарушении первичного ключа, поэтому ключ заменён обычным индексом
+    """
+    CREATE TABLE IF NOT EXISTS employer_salary_stats (
+        employer_id INTEGER NOT NULL,
+        vacancies_count INTEGER NOT NULL,
+        salaried_count INTEGER NOT NULL,
+        salary_sum BIGINT NOT NULL,
+        salary_min INTEGER,
+        salary_max INTEGER
+    )
+    """,
+]
+
+EMBEDDED_INDEXES_DDL = [
+    "CREATE INDEX IF NOT EXISTS vacancies_employer_idx ON vacancies (employer_id)",
+    "CREATE INDEX IF NOT EXISTS vacancies_location_idx ON vacancies (location)",
+    "CREATE INDEX IF NOT EXISTS employer_salary_stats_employer_idx ON employer_salary_stats (employer_id)",
+]
+
+SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT not null
+    )
+"""
+
+# Поколение данных, общее для всех процессов: увеличивается в транзакциях загрузки (см. src.query_cache)
+DATA_GENERATION_DDL = """
+    CREATE TABLE IF NOT EXISTS data_generation (
+        generation BIGINT not null
+    )
+"""
 
 
 def create_database(queries_manager: DBQueries) -> None:
-    """Создает базу данных, если она не существует."""
+    """Создает базу данных, если она не существует (встроенные базы создаются при подключении)."""
+    if queries_manager.dialect.embedded:
+        return
     load_dotenv()
 
     db_name = "companies_and_vacancies"
@@ -23,131 +154,397 @@ def create_database(queries_manager: DBQueries) -> None:
         queries_manager.execute_query(create_db_query)
 
 
-def setup_employers_table(queries_manager: DBQueries) -> str:
-    """Создает или пересоздает таблицу employers в базе данных."""
+def get_schema_version(queries_manager: DBQueries) -> int | None:
+    """Возвращает версию схемы, записанную в базе, или None, если схема ещё не создавалась."""
+    # Запрос к несуществующей таблице записался бы в лог как ошибка, поэтому сначала проверяем её наличие
+    if not queries_manager.execute_query(*queries_manager.dialect.table_exists("schema_version")):
+        return None
+    results = queries_manager.execute_query("SELECT version FROM schema_version")
+    return results[0][0] if results else None
+
+
+def create_trigram_index(cursor) -> bool:
+    """Создаёт триграммный индекс, если расширение pg_trgm доступно; иначе оставляет схему без него."""
+    cursor.execute("SAVEPOINT trigram_index")
     try:
-        queries_manager.execute_query(
-            "DROP TABLE IF EXISTS employers CASCADE;", is_select=False
-        )
-        queries_manager.execute_query(
-            """
-            CREATE TABLE IF NOT EXISTS employers (
-                employer varchar(100) PRIMARY KEY not null,
-                open_vacancies varchar(100)
-            )
-            """,
-            is_select=False,
-        )
-        return "Таблица 'employers' успешно создана/пересоздана."
+        for statement in TRIGRAM_DDL:
+            cursor.execute(statement)
+    except psycopg2.Error as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT trigram_index")
+        print(f"Триграммный индекс не создан, поиск подстроки будет без индекса: {e}")
+        return False
+    cursor.execute("RELEASE SAVEPOINT trigram_index")
+    return True
+
+
+def bump_data_generation(cursor) -> None:
+    """Увеличивает поколение данных в базе, чтобы кэши результатов всех процессов стали недействительными.
+
+    Вызывается последним оператором транзакции: блокировка строки счётчика держится до фиксации.
+    """
+    cursor.execute("UPDATE data_generation SET generation = generation + 1")
+
+
+def create_embedded_schema(cursor, dialect: Dialect) -> None:
+    """Пересоздаёт таблицы во встроенной базе (SQLite, DuckDB)."""
+    for table in ("employer_salary_stats", "vacancies", "employers"):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    for statement in EMBEDDED_DDL:
+        cursor.execute(statement.format(timestamp=dialect.timestamp_type))
+    if dialect.secondary_indexes:
+        for statement in EMBEDDED_INDEXES_DDL:
+            cursor.execute(statement)
+
+
+def ensure_schema(queries_manager: DBQueries) -> str:
+    """Создаёт таблицы, только если версия схемы в базе отличается от SCHEMA_VERSION.
+
+    Пересоздание выполняется в одной транзакции, поэтому читатели не видят пустых таблиц.
+    """
+    version = get_schema_version(queries_manager)
+    if version == SCHEMA_VERSION:
+        return f"Схема базы данных актуальна (версия {SCHEMA_VERSION})."
+
+    dialect = queries_manager.dialect
+    try:
+        with queries_manager.transaction() as conn, conn.cursor() as cursor:
+            if dialect.embedded:
+                create_embedded_schema(cursor, dialect)
+            else:
+                cursor.execute("DROP TABLE IF EXISTS employer_salary_stats, vacancies, employers CASCADE")
+                cursor.execute(EMPLOYERS_DDL)
+                cursor.execute(VACANCIES_DDL)
+                for statement in VACANCIES_INDEXES_DDL:
+                    cursor.execute(statement)
+                create_trigram_index(cursor)
+                cursor.execute(SALARY_STATS_DDL)
+            cursor.execute(SCHEMA_VERSION_DDL)
+            cursor.execute("DELETE FROM schema_version")
+            cursor.execute("INSERT INTO schema_version (version) VALUES (%s)", (SCHEMA_VERSION,))
+            # Счётчик не сбрасывается: иначе кэш другого процесса мог бы совпасть со старым значением
+            cursor.execute(DATA_GENERATION_DDL)
+            cursor.execute("SELECT COUNT(*) FROM data_generation")
+            if not cursor.fetchone()[0]:
+                cursor.execute("INSERT INTO data_generation (generation) VALUES (0)")
+            bump_data_generation(cursor)
+        bump_generation()
+        return f"Схема базы данных обновлена до версии {SCHEMA_VERSION}."
     except Exception as e:
-        print(f"Ошибка при создании таблицы employers: {e}")
-        return "Ошибка при создании таблицы employers."
+        print(f"Ошибка при обновлении схемы базы данных: {e}")
+        return "Ошибка при обновлении схемы базы данных."
+
+
+def upsert_employers(
+    cursor, employers_list: Iterable[Employer | Dict[str, Any]], dialect: Dialect = POSTGRESQL
+) -> int:
+    """Добавляет или обновляет работодателей (записи Employer или объекты employer из hh.ru) одним запросом.
+
+    Возвращает количество впервые добавленных работодателей.
+    """
+    employers = {}
+    for employer in employers_list:
+        if not isinstance(employer, Employer):
+            employer = Employer.from_api(employer)
+        employers[employer.employer_id] = employer
+    if not employers:
+        return 0
+    ids = sorted(employers)
+    if dialect.embedded:
+        return _upsert_employers_embedded(cursor, [employers[employer_id] for employer_id in ids], dialect)
+    cursor.execute(
+        """
+        INSERT INTO employers (employer_id, name, url, open_vacancies)
+        SELECT * FROM unnest(%s::int[], %s::varchar[], %s::text[], %s::int[])
+        ON CONFLICT (employer_id) DO UPDATE SET
+            name = EXCLUDED.name,
+            url = COALESCE(EXCLUDED.url, employers.url),
+            open_vacancies = COALESCE(EXCLUDED.open_vacancies, employers.open_vacancies)
+        WHERE (employers.name, employers.url, employers.open_vacancies) IS DISTINCT FROM (
+            EXCLUDED.name,
+            COALESCE(EXCLUDED.url, employers.url),
+            COALESCE(EXCLUDED.open_vacancies, employers.open_vacancies)
+        )
+        RETURNING (xmax = 0)
+        """,
+        (
+            ids,
+            [employers[employer_id].name for employer_id in ids],
+            [employers[employer_id].url for employer_id in ids],
+            [employers[employer_id].vacancies_count for employer_id in ids],
+        ),
+    )
+    return sum(1 for (inserted,) in cursor.fetchall() if inserted)
+
+
+def _upsert_employers_embedded(cursor, employers: List[Employer], dialect: Dialect) -> int:
+    """upsert_employers для встроенных баз: без unnest и xmax новые работодатели считаются заранее."""
+    condition, params = dialect.in_list("employer_id", [employer.employer_id for employer in employers])
+    cursor.execute(f"SELECT COUNT(*) FROM employers WHERE {condition}", params)
+    existing = cursor.fetchone()[0]
+    cursor.executemany(
+        """
+        INSERT INTO employers (employer_id, name, url, open_vacancies)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (employer_id) DO UPDATE SET
+            name = EXCLUDED.name,
+            url = COALESCE(EXCLUDED.url, employers.url),
+            open_vacancies = COALESCE(EXCLUDED.open_vacancies, employers.open_vacancies)
+        """,
+        [(employer.employer_id, employer.name, employer.url, employer.vacancies_count) for employer in employers],
+    )
+    return len(employers) - existing
 
 
 def populate_employers_table(
-    employers_list: List[Dict[str, Optional[str]]], queries_manager: DBQueries
+    employers_list: List[Employer | Dict[str, Any]], queries_manager: DBQueries
 ) -> str:
-    """Заполняет таблицу employers данными."""
+    """Заполняет таблицу employers данными работодателей hh.ru (id, name, alternate_url, open_vacancies)."""
     try:
-        for employer in employers_list:
-            name_employer = employer["name"]
-            open_vacancies = employer["open_vacancies"]
-            queries_manager.execute_query(
-                "INSERT INTO employers VALUES (%s, %s) ON CONFLICT (employer) DO NOTHING",  # Избегаем дубликатов
-                (name_employer, open_vacancies),
-            )
+        with queries_manager.transaction() as conn, conn.cursor() as cursor:
+            upsert_employers(cursor, employers_list, queries_manager.dialect)
+            bump_data_generation(cursor)
+        bump_generation()
         return "Работодатели успешно добавлены в таблицу 'employers'."
     except Exception as e:
         print(e)
         return "Ошибка при заполнении таблицы employers."
 
 
-def setup_vacancies_table(queries_manager: DBQueries) -> str:
-    """Создает или пересоздает таблицу vacancies в базе данных."""
-    try:
-        queries_manager.execute_query(
-            "DROP TABLE IF EXISTS vacancies;", is_select=False
+VACANCY_COLUMNS = (
+    "vacancy_id",
+    "employer_id",
+    "name_vacancy",
+    "area_id",
+    "location",
+    "salary_from",
+    "salary_to",
+    "currency",
+    "url",
+    "published_at",
+    "content_hash",
+)
+
+
+def vacancy_to_row(vacancy: Vacancy) -> tuple:
+    """Преобразует запись Vacancy в строку таблицы vacancies (порядок VACANCY_COLUMNS)."""
+    row = (
+        vacancy.vacancy_id,
+        vacancy.employer_id,
+        vacancy.name,
+        vacancy.area_id,
+        vacancy.location,
+        vacancy.salary_from,
+        vacancy.salary_to,
+        vacancy.currency,
+        vacancy.url,
+        vacancy.published_at,
+    )
+    # Хэш содержимого позволяет обновлять только действительно изменившиеся вакансии
+    content_hash = hashlib.md5("\x1f".join(map(str, row)).encode("utf-8")).hexdigest()
+    return row + (content_hash,)
+
+
+def refresh_salary_stats(
+    cursor, employer_ids: Iterable[int] | None = None, dialect: Dialect = POSTGRESQL
+) -> None:
+    """Пересчитывает агрегаты employer_salary_stats для указанных работодателей (или для всех).
+
+    Вызывается в транзакции загрузки, поэтому агрегаты всегда согласованы с vacancies,
+    а пересчёт затрагивает только работодателей, чьи вакансии менялись.
+    """
+    if employer_ids is None:
+        condition, params = "", ()
+        cursor.execute("DELETE FROM employer_salary_stats")
+    else:
+        condition, params = dialect.in_list("employer_id", sorted(set(employer_ids)))
+        condition = f"WHERE {condition}"
+        cursor.execute(f"DELETE FROM employer_salary_stats {condition}", params)
+    midpoint = dialect.int_div("salary_from + salary_to", "2")
+    cursor.execute(
+        f"""
+        INSERT INTO employer_salary_stats
+            (employer_id, vacancies_count, salaried_count, salary_sum, salary_min, salary_max)
+        SELECT
+            employer_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE salary_from > 0 AND salary_to > 0),
+            COALESCE(SUM({midpoint}) FILTER (WHERE salary_from > 0 AND salary_to > 0), 0),
+            MIN({midpoint}) FILTER (WHERE salary_from > 0 AND salary_to > 0),
+            MAX({midpoint}) FILTER (WHERE salary_from > 0 AND salary_to > 0)
+        FROM vacancies
+        {condition}
+        GROUP BY employer_id
+        """,
+        params,
+    )
+
+
+def _load_rows_postgresql(cursor, dialect: Dialect, rows: List[tuple], counts: Dict[str, int]) -> None:
+    """Переносит строки в vacancies через COPY во временную таблицу и INSERT ... ON CONFLICT."""
+    columns = ", ".join(VACANCY_COLUMNS)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in VACANCY_COLUMNS[1:])
+    cursor.execute(
+        """
+        CREATE TEMP TABLE vacancies_staging
+        (LIKE vacancies INCLUDING DEFAULTS) ON COMMIT DROP
+        """
+    )
+    dialect.copy_rows(cursor, "vacancies_staging", VACANCY_COLUMNS, rows)
+    cursor.execute(
+        f"""
+        INSERT INTO vacancies ({columns})
+        SELECT DISTINCT ON (vacancy_id) {columns} FROM vacancies_staging
+        ORDER BY vacancy_id
+        ON CONFLICT (vacancy_id) DO UPDATE SET {updates}, synced_at = now()
+        WHERE vacancies.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+        RETURNING (xmax = 0)
+        """
+    )
+    for (inserted,) in cursor.fetchall():
+        counts["inserted" if inserted else "updated"] += 1
+    cursor.execute("SELECT COUNT(DISTINCT vacancy_id) FROM vacancies_staging")
+    counts["unchanged"] = cursor.fetchone()[0] - counts["inserted"] - counts["updated"]
+
+
+def _load_rows_embedded(cursor, dialect: Dialect, rows: List[tuple], counts: Dict[str, int]) -> None:
+    """Переносит строки в vacancies встроенной базы; без xmax категории считаются до вставки."""
+    columns = ", ".join(VACANCY_COLUMNS)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in VACANCY_COLUMNS[1:])
+    rows = list({row[0]: row for row in rows}.values())  # DISTINCT ON недоступен в SQLite
+    cursor.execute("DROP TABLE IF EXISTS vacancies_staging")
+    cursor.execute(f"CREATE TEMP TABLE vacancies_staging AS SELECT {columns} FROM vacancies LIMIT 0")
+    if rows:
+        dialect.copy_rows(cursor, "vacancies_staging", VACANCY_COLUMNS, rows)
+    cursor.execute(
+        """
+        SELECT
+            COUNT(*) FILTER (WHERE v.vacancy_id IS NULL),
+            COUNT(*) FILTER (WHERE v.content_hash <> s.content_hash)
+        FROM vacancies_staging s
+        LEFT JOIN vacancies v ON v.vacancy_id = s.vacancy_id
+        """
+    )
+    counts["inserted"], counts["updated"] = cursor.fetchone()
+    counts["unchanged"] = len(rows) - counts["inserted"] - counts["updated"]
+    # WHERE true нужен SQLite, чтобы отличить ON CONFLICT от условия соединения в SELECT
+    cursor.execute(
+        f"""
+        INSERT INTO vacancies ({columns})
+        SELECT {columns} FROM vacancies_staging WHERE true
+        ON CONFLICT (vacancy_id) DO UPDATE SET {updates}, synced_at = {dialect.now}
+        WHERE vacancies.content_hash <> EXCLUDED.content_hash
+        """
+    )
+
+
+def bulk_load_vacancies(
+    vacancies_list: List[Vacancy | Dict[str, Any]],
+    queries_manager: DBQueries,
+    prune_employers: Iterable[int] | None = None,
+) -> Dict[str, int]:
+    """Инкрементально загружает пакет вакансий в одной транзакции через COPY во временную таблицу.
+
+    Сначала однократно добавляются работодатели из самих вакансий, затем вакансии
+    копируются в staging-таблицу и переносятся в vacancies одним INSERT ... ON CONFLICT
+    по ID вакансии hh.ru: новые добавляются, изменившиеся (по хэшу содержимого) обновляются,
+    остальные не трогаются. Для работодателей из prune_employers (ID hh.ru) удаляются вакансии,
+    отсутствующие в пакете. Принимает записи Vacancy или вакансии в формате ответа hh.ru.
+    Возвращает количество строк в каждой категории.
+    """
+    started = time.perf_counter()
+    records = [
+        vacancy if isinstance(vacancy, Vacancy) else Vacancy.from_api(vacancy) for vacancy in vacancies_list
+    ]
+    rows = [vacancy_to_row(record) for record in records]
+    prune_employers = sorted({int(employer_id) for employer_id in prune_employers or ()})
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "employers_inserted": 0}
+    if not rows and not prune_employers:
+        return counts
+
+    employer_ids = sorted({row[1] for row in rows})
+    dialect = queries_manager.dialect
+    load_rows = _load_rows_embedded if dialect.embedded else _load_rows_postgresql
+
+    with queries_manager.transaction() as conn, conn.cursor() as cursor:
+        counts["employers_inserted"] = upsert_employers(
+            cursor,
+            (Employer(record.employer_id, record.employer, url=record.employer_url) for record in records),
+            dialect,
         )
-        queries_manager.execute_query(
-            """
-            CREATE TABLE IF NOT EXISTS vacancies (
-                name_vacancy text not null,
-                employer varchar(100) not null,
-                location varchar(100) not null,
-                salary_from INT not null,
-                salary_to INT not null,
-                currency varchar(10) not null,
-                url text not null,
-                FOREIGN KEY (employer) REFERENCES employers(employer),
-                UNIQUE (name_vacancy, employer)
+        load_rows(cursor, dialect, rows, counts)
+
+        if prune_employers:
+            condition, params = dialect.in_list("employer_id", prune_employers)
+            cursor.execute(
+                f"""
+                DELETE FROM vacancies
+                WHERE {condition}
+                  AND NOT EXISTS (
+                      SELECT 1 FROM vacancies_staging s WHERE s.vacancy_id = vacancies.vacancy_id
+                  )
+                """,
+                params,
             )
-            """,
-            is_select=False,
-        )
-        return "Таблица 'vacancies' успешно создана/пересоздана."
-    except Exception as e:
-        print(f"Ошибка при создании таблицы vacancies: {e}")
-        return "Ошибка при создании таблицы vacancies."
+            counts["deleted"] = cursor.rowcount
 
+        changed = counts["inserted"] or counts["updated"] or counts["deleted"]
+        if changed:
+            refresh_salary_stats(cursor, employer_ids + prune_employers, dialect)
+        # Staging-таблица удаляется сразу, чтобы пакеты можно было грузить в одной транзакции
+        cursor.execute("DROP TABLE vacancies_staging")
+        if changed or counts["employers_inserted"]:
+            bump_data_generation(cursor)
 
-def populate_vacancies_table(
-    vacancies_list: List[Dict[str, dict]], queries_manager: DBQueries
-) -> str | None:
-    """Заполняет таблицу vacancies данными."""
-    try:
-        for vacancy in vacancies_list:
-            name_vacancy = vacancy["name"]
-            employer_name = vacancy["employer"].get("name")
-            employer_id = vacancy["employer"].get("id")  # Получаем ID работодателя
-            location = vacancy["area"]["name"]
-            salary_from = (
-                vacancy["salary"]["from"]
-                if vacancy["salary"]["from"] is not None
-                else 0
-            )
-            salary_to = (
-                vacancy["salary"]["to"] if vacancy["salary"]["to"] is not None else 0
-            )
-            currency = vacancy["salary"]["currency"]
-            url_vacancy = vacancy["alternate_url"]
+    if changed or counts["employers_inserted"]:
+        bump_generation()  # Сбрасываем кэш результатов DBManager
 
-            # Проверяем, существует ли работодатель в таблице 'employers'
-            check_employer_query = "SELECT employer FROM employers WHERE employer = %s"
-            employer_exists = queries_manager.execute_query(
-                check_employer_query, (employer_name,)
-            )
+    REGISTRY.observe("ingest_batch_seconds", time.perf_counter() - started)
+    for result in ("inserted", "updated", "unchanged", "deleted"):
+        REGISTRY.inc("ingest_rows_total", {"result": result}, counts[result])
 
-            if not employer_exists:
-                # Если работодателя нет, добавляем его
-                insert_employer_query = """
-                    INSERT INTO employers (employer, open_vacancies)
-                    VALUES (%s, %s)
-                    ON CONFLICT (employer) DO NOTHING
-                """
-                queries_manager.execute_query(
-                    insert_employer_query, (employer_name, "N/A"), is_select=False
-                )
-
-            # Вставляем вакансию
-            queries_manager.execute_query(
-                """
-                INSERT INTO vacancies (name_vacancy, employer, location, salary_from, salary_to, currency, url)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (name_vacancy, employer) DO NOTHING
-                """,
-                (
-                    name_vacancy,
-                    employer_name,
-                    location,
-                    salary_from,
-                    salary_to,
-                    currency,
-                    url_vacancy,
-                ),
-                is_select=False,  # Указываем, что это INSERT запрос
+    return counts
+
+
+def prune_vacancies(
+    queries_manager: DBQueries, seen_ids_by_employer: Dict[int, Iterable[int]]
+) -> int:
+    """Удаляет вакансии работодателей, не встретившиеся при последней полной выгрузке.
+
+    Используется потоковой загрузкой, где вакансии приходят несколькими пакетами.
+    Возвращает количество удалённых строк.
+    """
+    deleted = 0
+    with queries_manager.transaction() as conn, conn.cursor() as cursor:
+        for employer_id, seen_ids in seen_ids_by_employer.items():
+            condition, params = queries_manager.dialect.in_list(
+                "vacancy_id", [int(vacancy_id) for vacancy_id in seen_ids], negate=True
             )
+            # В PostgreSQL текст запроса одинаков для всех работодателей и готовится один раз
+            query = queries_manager.prepare(conn, f"DELETE FROM vacancies WHERE employer_id = %s AND {condition}")
+            cursor.execute(query, (int(employer_id), *params))
+            deleted += cursor.rowcount
+        if deleted:
+            refresh_salary_stats(cursor, map(int, seen_ids_by_employer), queries_manager.dialect)
+            bump_data_generation(cursor)
+
+    if deleted:
+        bump_generation()
+    return deleted
 
-        return "Вакансии успешно добавлены в таблицу 'vacancies'."
+
+def populate_vacancies_table(
+    vacancies_list: List[Vacancy | Dict[str, Any]],
+    queries_manager: DBQueries,
+    prune_employers: Iterable[int] | None = None,
+) -> str | None:
+    """Синхронизирует таблицу vacancies с пакетом вакансий (только изменившиеся строки)."""
+    try:
+        counts = bulk_load_vacancies(vacancies_list, queries_manager, prune_employers)
+        return (
+            "Вакансии синхронизированы с таблицей 'vacancies': "
+            f"добавлено {counts['inserted']}, обновлено {counts['updated']}, "
+            f"без изменений {counts['unchanged']}, удалено {counts['deleted']}."
+        )
     except Exception as e:
         print(f"Ошибка при заполнении таблицы vacancies: {e}")
         return "Ошибка при заполнении таблицы vacancies."
@@ -155,38 +552,15 @@ def populate_vacancies_table(
 
 if __name__ == "__main__":
     load_dotenv()
-    db_connection = DBConnection()
+    db_connection = create_connection()
 
     local_queries_manager = DBQueries(db_connection)
 
     create_database(local_queries_manager)
 
-    print(setup_employers_table(local_queries_manager))
-    # Список ID конкретных работодателей
-    specific_employer_ids = [
-        "80",
-        "1740",
-        "2460946",
-        "15478",
-        "4233",
-        "59",
-        "1102601",
-        "208707",
-        "1373",
-        "106571",
-    ]
-    #  Получаем данные о работодателях по их ID
-    employers_data = []
-    for employer_id in specific_employer_ids:
-        employer_name = fetch_employer_name(employer_id)
-        if employer_name:
-            employers_data.append(
-                {"name": employer_name, "open_vacancies": "N/A"}
-            )  #  "N/A" или другое значение
-        else:
-            print(f"Не удалось получить имя для работодателя с ID {employer_id}")
-    print(populate_employers_table(employers_data, local_queries_manager))
-
-    print(setup_vacancies_table(local_queries_manager))
+    print(ensure_schema(local_queries_manager))
+    # Набор работодателей: файл или база (HH_EMPLOYERS), по умолчанию DEFAULT_EMPLOYER_IDS
+    specific_employer_ids = load_employer_ids(queries_manager=local_queries_manager)
+    # Работодатели добавляются из данных самих вакансий
     vacancies_data = fetch_vacancies_for_specific_employers(specific_employer_ids)
     print(populate_vacancies_table(vacancies_data, local_queries_manager))
@@ -1,13 +1,32 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
 
 import psycopg2
+from psycopg2 import pool
+
+from src.dialects import POSTGRESQL
+from src.embedded_connection import DuckDBConnection, SQLiteConnection
+from src.metrics import REGISTRY
+
+BACKENDS = {"postgresql": "PostgreSQL", "sqlite": "SQLite", "duckdb": "DuckDB"}
 
 
 class DBConnection:
-    """Управляет подключением к базе данных PostgreSQL."""
+    """Управляет пулом подключений к базе данных PostgreSQL."""
+
+    dialect = POSTGRESQL
+    Error = psycopg2.Error
 
-    def __init__(self):
-        """Инициализирует параметры подключения к базе данных из переменных окружения."""
+    def __init__(
+        self,
+        min_size: int | None = None,
+        max_size: int | None = None,
+        acquire_timeout: float | None = None,
+        health_check_interval: float | None = None,
+    ):
+        """Инициализирует параметры подключения и пула из аргументов или переменных окружения."""
         self.host = os.environ.get("DB_HOST", "localhost")
         self.port = os.environ.get("DB_PORT", "5432")
         self.user = os.environ.get("DB_USER", "postgres")
@@ -17,17 +36,142 @@ class DBConnection:
         if not self.password:
             raise ValueError("Необходимо установить переменную окружения DB_PASSWORD")
 
-    def get_connection(self):
-        """Устанавливает и возвращает подключение к базе данных."""
+        self.min_size = min_size if min_size is not None else int(os.environ.get("DB_POOL_MIN", "1"))
+        self.max_size = max_size if max_size is not None else int(os.environ.get("DB_POOL_MAX", "10"))
+        self.acquire_timeout = (
+            acquire_timeout if acquire_timeout is not None else float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+        )
+        # Соединение, простоявшее в пуле дольше этого интервала, проверяется запросом SELECT 1
+        self.health_check_interval = (
+            health_check_interval
+            if health_check_interval is not None
+            else float(os.environ.get("DB_POOL_HEALTH_CHECK", "30"))
+        )
+        if self.min_size < 0 or self.max_size < 1 or self.min_size > self.max_size:
+            raise ValueError("Некорректные размеры пула подключений")
+
+        self._pool: pool.ThreadedConnectionPool | None = None
+        self._pool_lock = threading.Lock()
+        # Семафор ограничивает число выданных соединений: при исчерпании пула ждём, а не падаем
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._last_used: dict[int, float] = {}
+
+    def _get_pool(self) -> pool.ThreadedConnectionPool:
+        """Лениво создаёт пул подключений."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pool.ThreadedConnectionPool(
+                        self.min_size,
+                        self.max_size,
+                        host=self.host,
+                        port=self.port,
+                        user=self.user,
+                        password=self.password,
+                        database=self.database,
+                    )
+        return self._pool
+
+    def _is_healthy(self, conn) -> bool:
+        """Проверяет, что соединение живо и не находится в незавершённой транзакции."""
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def acquire(self):
+        """Берёт из пула исправное подключение; при исчерпании пула ждёт освобождения."""
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            REGISTRY.inc("db_pool_timeouts_total")
+            raise pool.PoolError("Превышено время ожидания свободного подключения")
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-            )
+            connection_pool = self._get_pool()
+            conn = connection_pool.getconn()
+            if not self._is_healthy(conn):
+                self._last_used.pop(id(conn), None)
+                connection_pool.putconn(conn, close=True)
+                conn = connection_pool.getconn()
+            REGISTRY.observe("db_pool_acquire_seconds", time.perf_counter() - started)
             return conn
-        except psycopg2.Error as e:
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Возвращает подключение в пул, откатывая незавершённую транзакцию."""
+        try:
+            if not conn.closed and not discard:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                self._last_used[id(conn)] = time.monotonic()
+            else:
+                self._last_used.pop(id(conn), None)
+            if self._pool is not None:
+                self._pool.putconn(conn, close=discard or bool(conn.closed))
+        except psycopg2.Error:
+            self._last_used.pop(id(conn), None)
+            if self._pool is not None:
+                self._pool.putconn(conn, close=True)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер: выдаёт подключение из пула и возвращает его по завершении."""
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Разорванное соединение не должно вернуться в пул
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def get_connection(self):
+        """Берёт подключение из пула; его необходимо вернуть через release()."""
+        try:
+            return self.acquire()
+        except (psycopg2.Error, pool.PoolError) as e:
             print(f"Ошибка подключения к базе данных: {e}")
             return None
+
+    def close(self) -> None:
+        """Закрывает все подключения пула."""
+        with self._pool_lock:
+            if self._pool is not None and not self._pool.closed:
+                self._pool.closeall()
+            self._pool = None
+            self._last_used.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def create_connection(backend: str | None = None, **kwargs):
+    """Создаёт пул подключений выбранного бэкенда (по умолчанию из переменной окружения DB_BACKEND).
+
+    postgresql — сервер PostgreSQL (DBConnection), sqlite и duckdb — встроенные базы в файле DB_PATH,
+    не требующие сервера и пароля.
+    """
+    backend = (backend or os.environ.get("DB_BACKEND", "postgresql")).lower()
+    if backend == "postgresql":
+        return DBConnection(**kwargs)
+    if backend == "sqlite":
+        return SQLiteConnection(**kwargs)
+    if backend == "duckdb":
+        return DuckDBConnection(**kwargs)
+    raise ValueError(f"Неизвестный бэкенд базы данных: {backend} (доступны: {', '.join(BACKENDS)})")
@@ -1,34 +1,188 @@
-import psycopg2
+import hashlib
+import logging
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from psycopg2.extras import execute_batch
+
+from src.metrics import observe_query
+
+logger = logging.getLogger(__name__)
 
 
 class DBQueries:
     """Выполняет SQL-запросы к базе данных PostgreSQL."""
 
     def __init__(self, db_connection):
-        """Инициализирует DBQueries с подключением к базе данных."""
+        """Инициализирует DBQueries с пулом подключений к базе данных."""
         self.db_connection = db_connection
+        self._local = threading.local()  # Подключение текущей транзакции transaction() в этом потоке
+        # Имена операторов, подготовленных на каждом подключении; закрытые подключения удаляются сами
+        self._prepared: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._prepared_lock = threading.Lock()
+
+    @property
+    def dialect(self):
+        """Особенности SQL бэкенда (см. src.dialects)."""
+        return self.db_connection.dialect
+
+    @contextmanager
+    def transaction(self):
+        """Единица работы: запросы внутри блока выполняются на одном подключении и фиксируются одним COMMIT.
+
+        execute_query, execute_many и stream_query, вызванные внутри блока в том же потоке,
+        присоединяются к транзакции и не фиксируют её сами, а их ошибки пробрасываются и откатывают
+        всю транзакцию. Вложенный блок присоединяется к внешнему. Выдаёт подключение для работы
+        с курсором напрямую.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        with self.db_connection.connection() as conn:
+            self._local.conn = conn
+            try:
+                self.dialect.begin_write(conn)
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.conn = None
+
+    @contextmanager
+    def _connection(self):
+        """Выдаёт подключение текущей транзакции или новое из пула и признак, что транзакцией владеет вызывающий."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn, False
+            return
+        with self.db_connection.connection() as conn:  # Подключение возвращается в пул автоматически
+            yield conn, True
+
+    def prepare(self, conn, query: str) -> str:
+        """Подготавливает запрос на подключении и возвращает текст для его выполнения с теми же параметрами.
+
+        В PostgreSQL запрос разбирается и планируется один раз (PREPARE), а затем выполняется
+        через EXECUTE. Встроенные базы кэшируют разобранные запросы сами, для них запрос
+        возвращается без изменений.
+        """
+        if not self.dialect.prepared_statements:
+            return query
+        name = f"stmt_{hashlib.md5(query.encode()).hexdigest()[:16]}"
+        count = query.count("%s")
+        with self._prepared_lock:
+            prepared = self._prepared.setdefault(conn, set())
+        if name not in prepared:
+            parts = query.replace("%%", "%").split("%s")
+            body = "".join(f"{part}${number}" for number, part in enumerate(parts[:-1], 1)) + parts[-1]
+            with conn.cursor() as cursor:
+                # PREPARE не транзакционный: оператор переживает откат и живёт до закрытия подключения
+                cursor.execute(f"PREPARE {name} AS {body}")
+            prepared.add(name)
+        return f"EXECUTE {name} ({', '.join(['%s'] * count)})" if count else f"EXECUTE {name}"
 
     def execute_query(
-        self, query: str, params: tuple | None = None, is_select: bool = True
+        self, query: str, params: tuple | None = None, is_select: bool = True, prepare: bool = False
     ) -> list:
-        """Выполняет SQL-запрос и возвращает результаты."""
-        conn = self.db_connection.get_connection()  # Получаем подключение к базе данных
-        if not conn:
-            return []
+        """Выполняет SQL-запрос на подключении из пула и возвращает результаты.
 
-        cursor = None  # Инициализируем курсор
+        С prepare=True часто повторяемый запрос выполняется как подготовленный оператор (см. prepare).
+        """
         try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)  # Выполняем SQL-запрос
-            if is_select:  # Если запрос - SELECT, получаем результаты
-                return cursor.fetchall()
-            else:
-                conn.commit()  # Фиксируем изменения для не-SELECT запросов
-                return []  # Возвращаем пустой список для таких запросов
-        except psycopg2.Error as e:
-            if conn:
-                conn.rollback()  # Откатываем транзакцию в случае ошибки
+            with self._connection() as (conn, owned):
+                started = time.perf_counter()
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute(self.prepare(conn, query) if prepare else query, params)  # Выполняем SQL-запрос
+                        if is_select:  # Если запрос - SELECT, получаем результаты
+                            results = cursor.fetchall()
+                            if owned:
+                                conn.rollback()  # Завершаем транзакцию чтения перед возвратом в пул
+                            observe_query(query, time.perf_counter() - started, len(results))
+                            return results
+                        rows = cursor.rowcount
+                    if owned:
+                        conn.commit()  # Фиксируем изменения для не-SELECT запросов
+                    observe_query(query, time.perf_counter() - started, rows)
+                    return []  # Возвращаем пустой список для таких запросов
+                except self.db_connection.Error:
+                    observe_query(query, time.perf_counter() - started, 0, error=True)
+                    if owned:
+                        conn.rollback()  # Откатываем транзакцию в случае ошибки
+                    raise
+        except self.db_connection.Error as e:
+            if getattr(self._local, "conn", None) is not None:
+                raise  # Внутри transaction() ошибка откатывает всю единицу работы
+            logger.error("Ошибка выполнения запроса: %s", e)
             return []
-        finally:
-            if cursor:
-                cursor.close()  # Закрываем курсор
+
+    def execute_many(
+        self, query: str, params_seq: Iterable[tuple], page_size: int = 1000, prepare: bool = True
+    ) -> int:
+        """Выполняет запрос для каждого набора параметров одним COMMIT и возвращает число наборов.
+
+        В PostgreSQL наборы отправляются пачками по page_size (execute_batch), по одному обращению
+        к серверу на пачку, и с prepare=True выполняются как подготовленный оператор.
+        При ошибке откатываются все наборы, а исключение пробрасывается.
+        """
+        params_seq = list(params_seq)
+        if not params_seq:
+            return 0
+        with self._connection() as (conn, owned):
+            started = time.perf_counter()
+            try:
+                with conn.cursor() as cursor:
+                    if self.dialect.embedded:
+                        cursor.executemany(query, params_seq)
+                    else:
+                        statement = self.prepare(conn, query) if prepare else query
+                        execute_batch(cursor, statement, params_seq, page_size=page_size)
+                if owned:
+                    conn.commit()
+            except self.db_connection.Error:
+                observe_query(query, time.perf_counter() - started, 0, error=True)
+                if owned:
+                    conn.rollback()
+                raise
+            observe_query(query, time.perf_counter() - started, len(params_seq))
+            return len(params_seq)
+
+    def stream_query(self, query: str, params: tuple | None = None, batch_size: int = 1000) -> Iterator[tuple]:
+        """Лениво выдаёт строки SELECT-запроса через именованный серверный курсор.
+
+        Строки читаются порциями по batch_size, поэтому память не зависит от размера
+        результата. Подключение занято до исчерпания или закрытия генератора.
+        """
+        with self._connection() as (conn, owned):
+            elapsed = 0.0
+            count = 0
+            try:
+                # Во встроенных базах обычный курсор и так читает результат по мере fetchmany
+                cursor_kwargs = {"name": f"stream_{uuid.uuid4().hex}"} if self.dialect.server_side_cursors else {}
+                with conn.cursor(**cursor_kwargs) as cursor:
+                    started = time.perf_counter()
+                    cursor.execute(query, params)
+                    elapsed += time.perf_counter() - started
+                    while True:
+                        started = time.perf_counter()
+                        rows = cursor.fetchmany(batch_size)
+                        elapsed += time.perf_counter() - started
+                        if not rows:
+                            break
+                        count += len(rows)
+                        yield from rows
+            finally:
+                # Только время базы (execute и fetchmany), без обработки строк потребителем между порциями
+                observe_query(query, elapsed, count)
+                if owned:
+                    conn.rollback()  # Закрываем транзакцию курсора перед возвратом подключения в пул
+
+    def close(self) -> None:
+        """Закрывает пул подключений."""
+        self.db_connection.close()
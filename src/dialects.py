@@ -0,0 +1,159 @@
+import csv
+import io
+import os
+import sqlite3
+import tempfile
+from typing import Iterable, Sequence
+
+
+class Dialect:
+    """Особенности SQL бэкенда хранения; базовый класс описывает PostgreSQL.
+
+    Запросы во всём проекте пишутся с параметрами %s; встроенные бэкенды
+    подставляют свой стиль параметров сами (см. src.embedded_connection).
+    """
+
+    name = "postgresql"
+    embedded = False
+    # Именованные серверные курсоры для потокового чтения (DBQueries.stream_query)
+    server_side_cursors = True
+    # Полнотекстовый поиск с русской морфологией (tsvector)
+    full_text_search = True
+    # Серверные подготовленные операторы PREPARE/EXECUTE (DBQueries.prepare)
+    prepared_statements = True
+    # Агрегаты percentile_cont(...) WITHIN GROUP (ORDER BY ...) (src.salary_analytics)
+    ordered_set_aggregates = True
+    timestamp_type = "timestamptz"
+    now = "now()"
+    secondary_indexes = True
+    # Одновременная запись в базу из нескольких процессов (src.sharded_ingest)
+    multiprocess_writes = True
+
+    def table_exists(self, table: str) -> tuple[str, tuple]:
+        """Запрос, возвращающий строку, если таблица существует в текущей схеме."""
+        return (
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = current_schema() AND table_name = %s",
+            (table,),
+        )
+
+    def begin_write(self, conn) -> None:
+        """Начинает пишущую транзакцию DBQueries.transaction (в PostgreSQL её начинает первый запрос)."""
+
+    def ilike(self, column: str) -> str:
+        """Условие регистронезависимого поиска по шаблону LIKE с экранированием обратной косой чертой."""
+        return f"{column} ILIKE %s"
+
+    def decimal(self, expression: str) -> str:
+        """Приводит выражение к дробному типу, чтобы деление не было целочисленным."""
+        return f"({expression})::numeric"
+
+    def int_div(self, numerator: str, denominator: str) -> str:
+        """Целочисленное деление."""
+        return f"({numerator}) / {denominator}"
+
+    def floor(self, expression: str) -> str:
+        """Округление вниз неотрицательного выражения до целого."""
+        return f"FLOOR({expression})"
+
+    def in_list(self, column: str, values: Iterable, negate: bool = False) -> tuple[str, tuple]:
+        """Условие принадлежности столбца списку значений и его параметры."""
+        operator = "<> ALL(%s)" if negate else "= ANY(%s)"
+        return f"{column} {operator}", (list(values),)
+
+    def copy_rows(self, cursor, table: str, columns: Sequence[str], rows: list) -> None:
+        """Быстро загружает строки в таблицу (в PostgreSQL — COPY из CSV-буфера)."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+class SQLiteDialect(Dialect):
+    """SQLite: ILIKE эмулируется через lower() (см. SQLiteConnection), полнотекстового поиска нет."""
+
+    name = "sqlite"
+    embedded = True
+    server_side_cursors = False
+    full_text_search = False
+    # Встроенные базы сами кэшируют разобранные запросы на подключении
+    prepared_statements = False
+    # Перцентили вычисляются оконными функциями
+    ordered_set_aggregates = False
+    timestamp_type = "TIMESTAMP"
+    now = "CURRENT_TIMESTAMP"
+
+    def table_exists(self, table: str) -> tuple[str, tuple]:
+        return "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", (table,)
+
+    def begin_write(self, conn) -> None:
+        # Отложенная транзакция, начавшаяся с чтения, при первой записи получает "database is locked"
+        # без ожидания busy_timeout, если пишет другой процесс; IMMEDIATE сразу ждёт блокировку записи
+        sqlite3.Cursor(conn).execute("BEGIN IMMEDIATE")
+
+    def ilike(self, column: str) -> str:
+        return f"lower({column}) LIKE lower(%s) ESCAPE '\\'"
+
+    def decimal(self, expression: str) -> str:
+        return f"CAST({expression} AS REAL)"
+
+    def floor(self, expression: str) -> str:
+        # Математические функции есть не во всех сборках SQLite; для неотрицательных чисел CAST отбрасывает дробь
+        return f"CAST({expression} AS INTEGER)"
+
+    def in_list(self, column: str, values: Iterable, negate: bool = False) -> tuple[str, tuple]:
+        values = tuple(values)
+        if not values:
+            return ("1 = 1" if negate else "1 = 0"), ()
+        placeholders = ", ".join(["%s"] * len(values))
+        return f"{column} {'NOT IN' if negate else 'IN'} ({placeholders})", values
+
+    def copy_rows(self, cursor, table: str, columns: Sequence[str], rows: list) -> None:
+        placeholders = ", ".join(["%s"] * len(columns))
+        cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+class DuckDBDialect(SQLiteDialect):
+    """DuckDB: колоночный движок; в отличие от SQLite есть ILIKE, а '/' всегда даёт дробь."""
+
+    name = "duckdb"
+    # Колоночному хранилищу хватает zone maps, а ART-индексы только замедляют загрузку
+    secondary_indexes = False
+    # В DO UPDATE SET DuckDB принимает CURRENT_TIMESTAMP за имя столбца
+    now = "now()"
+    ordered_set_aggregates = True
+    # Файл базы DuckDB открывается на запись только одним процессом
+    multiprocess_writes = False
+
+    def table_exists(self, table: str) -> tuple[str, tuple]:
+        return Dialect.table_exists(self, table)
+
+    def begin_write(self, conn) -> None:
+        pass
+
+    def ilike(self, column: str) -> str:
+        return f"{column} ILIKE %s ESCAPE '\\'"
+
+    def decimal(self, expression: str) -> str:
+        return f"CAST({expression} AS DOUBLE)"
+
+    def floor(self, expression: str) -> str:
+        return f"FLOOR({expression})"
+
+    def int_div(self, numerator: str, denominator: str) -> str:
+        return f"({numerator}) // {denominator}"
+
+    def copy_rows(self, cursor, table: str, columns: Sequence[str], rows: list) -> None:
+        # Построчная вставка в DuckDB медленная, поэтому строки загружаются COPY из временного CSV-файла
+        file = tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", encoding="utf-8", delete=False)
+        try:
+            with file:
+                csv.writer(file).writerows(rows)
+            path = file.name.replace("'", "''")
+            cursor.execute(f"COPY {table} ({', '.join(columns)}) FROM '{path}' (FORMAT csv, HEADER false)")
+        finally:
+            os.unlink(file.name)
+
+
+POSTGRESQL = Dialect()
+SQLITE = SQLiteDialect()
+DUCKDB = DuckDBDialect()
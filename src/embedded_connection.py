@@ -0,0 +1,270 @@
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+from src.dialects import DUCKDB, SQLITE
+
+_DML = re.compile(r"^\s*(INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+class EmbeddedConnection:
+    """Пул подключений встроенной базы данных с тем же интерфейсом, что у DBConnection.
+
+    Не требует сервера и пароля: база хранится в файле path (или в памяти при path=":memory:").
+    Подключения выдают курсоры с параметрами %s и неявными транзакциями, как psycopg2,
+    поэтому код загрузки и DBManager работает с ними без изменений.
+    """
+
+    dialect = None
+    Error = Exception
+    default_path = ""
+
+    def __init__(self, path: str | None = None, max_size: int | None = None):
+        """Инициализирует пул для файла path (по умолчанию из переменной окружения DB_PATH)."""
+        self.path = path or os.environ.get("DB_PATH", self.default_path)
+        self.max_size = max_size if max_size is not None else int(os.environ.get("DB_POOL_MAX", "4"))
+        if self.max_size < 1:
+            raise ValueError("Некорректные размеры пула подключений")
+        self._idle: list = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+
+    def _connect(self):
+        """Открывает новое подключение к базе."""
+        raise NotImplementedError
+
+    def _close_database(self) -> None:
+        """Освобождает ресурсы базы после закрытия всех подключений."""
+
+    def acquire(self):
+        """Берёт подключение из пула; при исчерпании пула ждёт освобождения."""
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop()
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Возвращает подключение в пул, откатывая незавершённую транзакцию."""
+        try:
+            conn.rollback()
+            if discard:
+                conn.close()
+            else:
+                with self._lock:
+                    self._idle.append(conn)
+        except self.Error:
+            conn.close()
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер: выдаёт подключение из пула и возвращает его по завершении."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def get_connection(self):
+        """Берёт подключение из пула; его необходимо вернуть через release()."""
+        try:
+            return self.acquire()
+        except self.Error as e:
+            print(f"Ошибка подключения к базе данных: {e}")
+            return None
+
+    def close(self) -> None:
+        """Закрывает все подключения пула."""
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+            self._close_database()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _unicode_lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+class _SQLiteCursor(sqlite3.Cursor):
+    """Курсор SQLite с параметрами %s, неявным началом транзакции и поддержкой with."""
+
+    def execute(self, query, params=None):
+        if not self.connection.in_transaction:
+            super().execute("BEGIN")
+        return super().execute(query.replace("%s", "?"), params or ())
+
+    def executemany(self, query, params_seq):
+        if not self.connection.in_transaction:
+            super().execute("BEGIN")
+        return super().executemany(query.replace("%s", "?"), params_seq)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _SQLiteConnection(sqlite3.Connection):
+    def cursor(self, factory=_SQLiteCursor):
+        return super().cursor(factory)
+
+
+class SQLiteConnection(EmbeddedConnection):
+    """Встроенная база SQLite (модуль стандартной библиотеки)."""
+
+    dialect = SQLITE
+    Error = sqlite3.Error
+    default_path = "corpbase.sqlite3"
+
+    def __init__(self, path: str | None = None, max_size: int | None = None):
+        """Инициализирует пул; база в памяти разделяется подключениями через общий кэш."""
+        super().__init__(path, max_size)
+        self._uri = False
+        self._keeper = None
+        if self.path == ":memory:":
+            # Пока открыто хотя бы одно подключение, база в памяти существует
+            self.path, self._uri = f"file:corpbase_{uuid.uuid4().hex}?mode=memory&cache=shared", True
+            self._keeper = self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            uri=self._uri,
+            isolation_level=None,  # Транзакциями управляет курсор (BEGIN) и commit()/rollback()
+            check_same_thread=False,
+            factory=_SQLiteConnection,
+        )
+        # Встроенная lower() понимает только ASCII; для ILIKE по кириллице нужна юникодная
+        conn.create_function("lower", 1, _unicode_lower, deterministic=True)
+        cursor = sqlite3.Cursor(conn)  # Обычный курсор: PRAGMA нельзя выполнять внутри транзакции
+        if not self._uri:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+        return conn
+
+    def _close_database(self) -> None:
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+
+
+class _DuckDBCursor:
+    """Курсор поверх подключения DuckDB: параметры %s, неявные транзакции и rowcount для DML."""
+
+    def __init__(self, connection: "_DuckDBConnection"):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        self.connection.begin()
+        raw = self.connection.raw
+        raw.execute(query.replace("%s", "?"), params or ())
+        self.description = raw.description
+        self.rowcount = -1
+        # DuckDB возвращает число затронутых строк как результат из одного столбца Count
+        if _DML.match(query) and "RETURNING" not in query.upper():
+            row = raw.fetchone()
+            self.rowcount = row[0] if row else -1
+            self.description = None
+        return self
+
+    def executemany(self, query, params_seq):
+        self.connection.begin()
+        self.connection.raw.executemany(query.replace("%s", "?"), list(params_seq))
+        self.rowcount = -1
+        return self
+
+    def fetchone(self):
+        return self.connection.raw.fetchone()
+
+    def fetchmany(self, size=1):
+        return self.connection.raw.fetchmany(size)
+
+    def fetchall(self):
+        return self.connection.raw.fetchall()
+
+    def close(self):
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _DuckDBConnection:
+    """Подключение DuckDB с транзакциями в стиле DB-API (commit/rollback без ошибок вне транзакции)."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.in_transaction = False
+
+    def cursor(self):
+        return _DuckDBCursor(self)
+
+    def begin(self):
+        if not self.in_transaction:
+            self.raw.begin()
+            self.in_transaction = True
+
+    def commit(self):
+        if self.in_transaction:
+            self.in_transaction = False
+            self.raw.commit()
+
+    def rollback(self):
+        if self.in_transaction:
+            self.in_transaction = False
+            self.raw.rollback()
+
+    def close(self):
+        self.raw.close()
+
+
+class DuckDBConnection(EmbeddedConnection):
+    """Встроенная колоночная база DuckDB: быстрые агрегаты для аналитики DBManager.
+
+    Требует пакета duckdb (pip install duckdb). Подключения пула — курсоры одной базы,
+    каждый со своей транзакцией.
+    """
+
+    dialect = DUCKDB
+    default_path = "corpbase.duckdb"
+
+    def __init__(self, path: str | None = None, max_size: int | None = None):
+        """Открывает базу DuckDB; без установленного пакета duckdb сообщает, как его установить."""
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("Для бэкенда DuckDB установите пакет duckdb: pip install duckdb") from e
+        super().__init__(path, max_size)
+        self.Error = duckdb.Error
+        self._database = duckdb.connect(self.path)
+
+    def _connect(self):
+        return _DuckDBConnection(self._database.cursor())
+
+    def _close_database(self) -> None:
+        if self._database is not None:
+            self._database.close()
+            self._database = None
@@ -0,0 +1,71 @@
+import json
+import os
+from typing import Iterable, List
+
+# Набор работодателей по умолчанию (ID hh.ru)
+DEFAULT_EMPLOYER_IDS = [
+    "80",
+    "1740",
+    "2460946",
+    "15478",
+    "4233",
+    "59",
+    "1102601",
+    "208707",
+    "1373",
+    "106571",
+]
+
+
+def _unique(employer_ids: Iterable) -> List[str]:
+    """ID работодателей строками, без повторов, в исходном порядке; нечисловой ID — ValueError."""
+    unique = {}
+    for employer_id in employer_ids:
+        employer_id = str(employer_id).strip()
+        if not employer_id:
+            continue
+        if not employer_id.isdigit():
+            raise ValueError(f"Некорректный ID работодателя: {employer_id!r}")
+        unique[employer_id] = None
+    return list(unique)
+
+
+def read_employer_ids(path: str) -> List[str]:
+    """Читает ID работодателей из файла.
+
+    .json — список ID; иначе текст или CSV: ID — первое поле строки, пустые строки
+    и комментарии (#) пропускаются, первая строка может быть заголовком.
+    Нечисловой ID — ValueError с именем файла и самим значением.
+    """
+    with open(path, encoding="utf-8") as file:
+        if path.lower().endswith(".json"):
+            employer_ids = json.load(file)
+            if not isinstance(employer_ids, list):
+                raise ValueError(f"{path}: ожидается JSON-список ID работодателей")
+        else:
+            fields = (line.split("#", 1)[0].replace(";", ",").split(",", 1)[0].strip() for line in file)
+            employer_ids = [field for field in fields if field]
+            # Нечисловое первое поле первой строки — заголовок CSV
+            if employer_ids and not employer_ids[0].isdigit():
+                employer_ids.pop(0)
+    try:
+        return _unique(employer_ids)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+
+
+def load_employer_ids(source: str | None = None, queries_manager=None) -> List[str]:
+    """Возвращает набор работодателей для загрузки.
+
+    source (по умолчанию переменная окружения HH_EMPLOYERS): путь к файлу (см. read_employer_ids)
+    или "db" — все работодатели из таблицы employers. Без источника — DEFAULT_EMPLOYER_IDS.
+    """
+    source = source or os.environ.get("HH_EMPLOYERS")
+    if not source:
+        return list(DEFAULT_EMPLOYER_IDS)
+    if source == "db":
+        if queries_manager is None:
+            raise ValueError("Для набора работодателей из базы нужен DBQueries")
+        results = queries_manager.execute_query("SELECT employer_id FROM employers ORDER BY employer_id")
+        return _unique(row[0] for row in results)
+    return read_employer_ids(source)
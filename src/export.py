@@ -0,0 +1,238 @@
+import argparse
+import bz2
+import csv
+import functools
+import gzip
+import itertools
+import json
+import lzma
+import os
+import time
+from datetime import datetime
+from typing import Any, Iterable, Iterator, TextIO
+
+from dotenv import load_dotenv
+from psycopg2.extensions import encodings
+
+from src.companies_and_vacancies import VACANCIES_FROM
+from src.db_connection import create_connection
+from src.db_queries import DBQueries
+from src.metrics import REGISTRY
+from src.salary_analytics import vacancy_filters
+
+FORMATS = ("csv", "jsonl", "parquet")
+# Сжатие текстовых форматов потоком; Parquet сжимается постранично средствами pyarrow.
+# Уровень gzip 6 (как у zlib) вместо 9 по умолчанию: вдвое быстрее при почти том же размере.
+COMPRESSIONS = {"gzip": functools.partial(gzip.open, compresslevel=6), "bz2": bz2.open, "xz": lzma.open}
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+FORMAT_SUFFIXES = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+PARQUET_COMPRESSIONS = ("zstd", "snappy", "gzip", "brotli", "lz4", "none")
+
+# Столбец файла, выражение SQL и тип значения в Parquet
+EXPORT_COLUMNS = (
+    ("vacancy_id", "v.vacancy_id", "int64"),
+    ("employer_id", "v.employer_id", "int64"),
+    ("employer", "e.name", "string"),
+    ("name", "v.name_vacancy", "string"),
+    ("area_id", "v.area_id", "int64"),
+    ("location", "v.location", "string"),
+    ("salary_from", "v.salary_from", "int64"),
+    ("salary_to", "v.salary_to", "int64"),
+    ("currency", "v.currency", "string"),
+    ("url", "v.url", "string"),
+    ("published_at", "v.published_at", "timestamp"),
+)
+COLUMN_NAMES = [name for name, _, _ in EXPORT_COLUMNS]
+
+
+def detect_format(path: str) -> tuple[str | None, str | None]:
+    """Определяет формат и сжатие по расширению файла, например vacancies.jsonl.gz -> ("jsonl", "gzip")."""
+    root, suffix = os.path.splitext(path.lower())
+    compression = COMPRESSION_SUFFIXES.get(suffix)
+    if compression:
+        root, suffix = os.path.splitext(root)
+    return FORMAT_SUFFIXES.get(suffix), compression
+
+
+def export_query(dialect, **filters) -> tuple[str, tuple]:
+    """SELECT вакансий для выгрузки (столбцы EXPORT_COLUMNS) с фильтрами vacancy_filters."""
+    conditions, params = vacancy_filters(dialect, **filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    columns = ", ".join(f"{expression} AS {name}" for name, expression, _ in EXPORT_COLUMNS)
+    return f"SELECT {columns} FROM {VACANCIES_FROM} {where} ORDER BY v.vacancy_id", tuple(params)
+
+
+def _open_text(path: str, compression: str | None) -> TextIO:
+    """Открывает текстовый файл на запись, при необходимости со сжатием потоком."""
+    if compression is None:
+        return open(path, "w", encoding="utf-8", newline="")
+    return COMPRESSIONS[compression](path, "wt", encoding="utf-8", newline="")
+
+
+def _copy_to(queries_manager: DBQueries, query: str, params: tuple, file: TextIO, fmt: str) -> int:
+    """Выгружает результат запроса в файл через COPY ... TO STDOUT, минуя строки Python."""
+    with queries_manager.transaction() as conn, conn.cursor() as cursor:
+        # COPY не принимает параметров, поэтому они безопасно подставляются драйвером заранее
+        query = cursor.mogrify(query, params).decode(encodings[conn.encoding])
+        if fmt == "csv":
+            copy = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+        else:
+            # Символы-разделители, которых нет в JSON, отключают экранирование: строки выходят как есть
+            copy = (
+                f"COPY (SELECT row_to_json(x) FROM ({query}) x) "
+                "TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+            )
+        cursor.copy_expert(copy, file)
+        return cursor.rowcount
+
+
+def _json_default(value: Any) -> str:
+    """Сериализует даты так же, как row_to_json в PostgreSQL."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _write_rows(rows: Iterable[tuple], file: TextIO, fmt: str) -> int:
+    """Записывает строки в CSV или JSONL (для бэкендов без COPY TO STDOUT)."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(file)
+        writer.writerow(COLUMN_NAMES)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            record = dict(zip(COLUMN_NAMES, row))
+            file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_json_default))
+            file.write("\n")
+            count += 1
+    return count
+
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    """Делит поток строк на списки по size строк."""
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+
+def _timestamps(values: tuple) -> list:
+    """Даты из SQLite хранятся строками ISO 8601; для Parquet они разбираются в datetime."""
+    return [datetime.fromisoformat(value) if isinstance(value, str) else value for value in values]
+
+
+def _write_parquet(rows: Iterable[tuple], path: str, compression: str | None, batch_size: int) -> int:
+    """Записывает строки в Parquet группами по batch_size: в памяти не больше одной группы."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Для экспорта в Parquet установите пакет pyarrow: pip install pyarrow") from e
+    types = {"int64": pa.int64(), "string": pa.string(), "timestamp": pa.timestamp("us", tz="UTC")}
+    schema = pa.schema([(name, types[kind]) for name, _, kind in EXPORT_COLUMNS])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression=compression or "zstd") as writer:
+        for batch in _batches(rows, batch_size):
+            columns = list(zip(*batch))
+            arrays = [
+                pa.array(_timestamps(values) if kind == "timestamp" else values, type=types[kind])
+                for (_, _, kind), values in zip(EXPORT_COLUMNS, columns)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(batch)
+    return count
+
+
+def export_vacancies(
+    queries_manager: DBQueries,
+    path: str,
+    fmt: str | None = None,
+    compression: str | None = None,
+    batch_size: int = 50_000,
+    **filters,
+) -> int:
+    """Потоково выгружает вакансии в файл CSV, JSONL или Parquet и возвращает число строк.
+
+    Формат и сжатие по умолчанию определяются по расширению (vacancies.csv.gz, vacancies.parquet).
+    В PostgreSQL CSV и JSONL пишутся через COPY ... TO STDOUT прямо в (сжатый) файл; Parquet и
+    встроенные бэкенды читают строки серверным курсором порциями по batch_size, поэтому память
+    не зависит от размера выгрузки. Фильтры — как у vacancy_filters (employer_ids, location, keyword,
+    salary_min, salary_max). Файл появляется под именем path только после успешной записи.
+    """
+    detected_format, detected_compression = detect_format(path)
+    fmt = fmt or detected_format
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    if fmt == "parquet":
+        if compression not in (None, *PARQUET_COMPRESSIONS):
+            raise ValueError(f"Неизвестное сжатие Parquet: {compression}")
+    else:
+        compression = compression or detected_compression
+        if compression not in (None, *COMPRESSIONS):
+            raise ValueError(f"Неизвестное сжатие: {compression}")
+
+    dialect = queries_manager.dialect
+    query, params = export_query(dialect, **filters)
+    started = time.perf_counter()
+    partial = f"{path}.part"
+    try:
+        if fmt == "parquet":
+            rows = queries_manager.stream_query(query, params, batch_size=batch_size)
+            count = _write_parquet(rows, partial, compression, batch_size)
+        else:
+            with _open_text(partial, compression) as file:
+                if dialect.embedded:
+                    count = _write_rows(queries_manager.stream_query(query, params, batch_size=batch_size), file, fmt)
+                else:
+                    count = _copy_to(queries_manager, query, params, file, fmt)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.unlink(partial)
+        raise
+
+    REGISTRY.observe("export_seconds", time.perf_counter() - started, {"format": fmt})
+    REGISTRY.inc("export_rows_total", {"format": fmt}, count)
+    return count
+
+
+def main():
+    """Выгружает вакансии в файл из командной строки."""
+    parser = argparse.ArgumentParser(description="Выгрузка вакансий в CSV, JSONL или Parquet")
+    parser.add_argument("path", help="файл выгрузки; формат и сжатие определяются по расширению")
+    parser.add_argument("--format", choices=FORMATS, help="формат, если его нельзя определить по расширению")
+    parser.add_argument("--compression", help="gzip, bz2, xz; для Parquet — zstd, snappy, gzip, brotli, lz4, none")
+    parser.add_argument("--employer", type=int, action="append", help="ID работодателя hh.ru (можно повторять)")
+    parser.add_argument("--location", help="город")
+    parser.add_argument("--keyword", help="слово в названии вакансии")
+    parser.add_argument("--salary-min", type=float, help="нижняя граница зарплаты")
+    parser.add_argument("--salary-max", type=float, help="верхняя граница зарплаты")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="строк в порции чтения")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db_queries = DBQueries(create_connection())
+    try:
+        count = export_vacancies(
+            db_queries,
+            args.path,
+            fmt=args.format,
+            compression=args.compression,
+            batch_size=args.batch_size,
+            employer_ids=args.employer,
+            location=args.location,
+            keyword=args.keyword,
+            salary_min=args.salary_min,
+            salary_max=args.salary_max,
+        )
+        print(f"Выгружено вакансий: {count} в {args.path}")
+    except (ValueError, ImportError, OSError, db_queries.db_connection.Error) as e:
+        print(f"Ошибка выгрузки вакансий: {e}")
+    finally:
+        db_queries.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,200 @@
-from typing import Any, Dict, List
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from src.employer_sets import load_employer_ids
+from src.models import Vacancy
+from src.request_scheduler import RequestScheduler
+from src.response_cache import ResponseCache
+
+if TYPE_CHECKING:
+    from src.snapshots import SnapshotArchive, SnapshotRun
+
+API_URL = os.environ.get("HH_API_URL", "https://api.hh.ru")
+PER_PAGE = 100
+MAX_DEPTH = 2000  # hh.ru отдаёт не более 2000 результатов на один поисковый запрос
+DEFAULT_CONCURRENCY = int(os.environ.get("HH_CONCURRENCY", "8"))
+
+_session: requests.Session | None = None
+_scheduler: RequestScheduler | None = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = DEFAULT_CONCURRENCY) -> requests.Session:
+    """Возвращает общую HTTP-сессию с keep-alive, переиспользуемую всеми запросами к hh.ru."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = os.environ.get("HH_USER_AGENT", "CorpBase/0.1")
+                _session = session
+    return _session
+
+
+def get_scheduler() -> RequestScheduler:
+    """Возвращает общий планировщик запросов к hh.ru (ограничение частоты, повторы, AIMD, кэш ответов)."""
+    global _scheduler
+    if _scheduler is None:
+        session = get_session()
+        with _session_lock:
+            if _scheduler is None:
+                cache = None if os.environ.get("HH_CACHE_DISABLED") else ResponseCache()
+                _scheduler = RequestScheduler(session=session, max_concurrency=DEFAULT_CONCURRENCY, cache=cache)
+    return _scheduler
+
+
+class VacancyFetcher:
+    """Параллельно выгружает все страницы вакансий для набора работодателей."""
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        scheduler: RequestScheduler | None = None,
+        api_url: str | None = None,
+        archive: "SnapshotArchive | None" = None,
+    ):
+        """Инициализирует загрузчик с ограничением параллельности, общим планировщиком запросов и адресом API.
+
+        Если задан archive, каждый прогон iter_pages сохраняет исходные ответы API в снимок (см. src.snapshots).
+        """
+        self.scheduler = scheduler or get_scheduler()
+        self.api_url = api_url or API_URL
+        self.max_workers = max_workers or self.scheduler.max_concurrency
+        self.archive = archive
+        self.last_run: "SnapshotRun | None" = None  # Снимок последнего прогона iter_pages
+        self.failed: set[str] = set()
+
+    def fetch_page(self, employer_id: str, page: int) -> Dict[str, Any]:
+        """Получает одну страницу вакансий работодателя."""
+        params = {"employer_id": employer_id, "page": page, "per_page": PER_PAGE}
+        return self.scheduler.get_json(f"{self.api_url}/vacancies", params=params)
+
+    def iter_pages(
+        self, employer_ids: List[str], as_records: bool = False
+    ) -> Iterator[Tuple[str, int, List[Dict[str, Any]] | List[Vacancy]]]:
+        """Выдаёт (ID работодателя, номер страницы, валидные вакансии) по мере загрузки страниц.
+
+        При as_records=True вакансии сразу превращаются в компактные записи Vacancy,
+        и исходный JSON страницы не задерживается в памяти.
+
+        Одновременно в работе не более 2 * max_workers страниц, поэтому медленный
+        потребитель не накапливает в памяти ответы API. Узнав из первой страницы
+        количество страниц, загрузчик ставит остальные страницы работодателя в начало очереди.
+        """
+        self.failed = set()
+        # Снимок пишется только для исходного JSON страниц; незавершённый прогон остаётся без манифеста
+        run = self.archive.start_run(employer_ids, self.api_url) if self.archive is not None else None
+        self.last_run = run
+        tasks = deque((employer_id, 0) for employer_id in employer_ids)
+        max_in_flight = 2 * self.max_workers
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            while tasks or pending:
+                while tasks and len(pending) < max_in_flight:
+                    employer_id, page = tasks.popleft()
+                    pending[executor.submit(self.fetch_page, employer_id, page)] = (employer_id, page)
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    employer_id, page = pending.pop(future)
+                    try:
+                        vacancies_data = future.result()
+                    except requests.exceptions.RequestException as e:
+                        print(
+                            f"Ошибка при получении вакансий для работодателя с ID {employer_id} "
+                            f"(страница {page}): {e}"
+                        )
+                        self.failed.add(employer_id)
+                        continue
+
+                    if page == 0:
+                        pages = min(vacancies_data.get("pages", 1), MAX_DEPTH // PER_PAGE)
+                        if vacancies_data.get("found", 0) > MAX_DEPTH:
+                            # Вакансии за пределами окна недоступны: работодатель считается загруженным
+                            # не полностью, чтобы не удалить из базы вакансии, которых нет в выдаче
+                            print(
+                                f"У работодателя с ID {employer_id} {vacancies_data['found']} вакансий, "
+                                f"hh.ru отдаёт только первые {MAX_DEPTH}"
+                            )
+                            self.failed.add(employer_id)
+                        tasks.extendleft((employer_id, next_page) for next_page in range(pages - 1, 0, -1))
+
+                    if run is not None:
+                        run.record(employer_id, page, vacancies_data)
+                    yield employer_id, page, page_vacancies(vacancies_data, as_records)
+            if run is not None:
+                run.finish(self.failed)
+
+    def fetch_all(self, employer_ids: List[str]) -> List[Dict[str, Any]]:
+        """Загружает все вакансии работодателей, сохраняя порядок работодателей и страниц."""
+        pages: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        for employer_id, page, vacancies in self.iter_pages(employer_ids):
+            pages[(employer_id, page)] = vacancies
+
+        order = {employer_id: index for index, employer_id in enumerate(employer_ids)}
+        all_vacancies = []
+        for key in sorted(pages, key=lambda item: (order[item[0]], item[1])):
+            all_vacancies.extend(pages[key])
+
+        if self.failed:
+            print(
+                "Не удалось полностью загрузить вакансии работодателей "
+                f"{', '.join(sorted(self.failed))} после {self.scheduler.max_retries} повторов"
+            )
+        return all_vacancies
 
 
 def fetch_vacancies_for_specific_employers(
-    employer_ids: List[str],
+    employer_ids: List[str], max_workers: int | None = None
 ) -> List[Dict[str, Any]]:
-    """Получает список вакансий для указанных ID работодателей."""
-    all_vacancies = []
-
-    for employer_id in employer_ids:
-        employer_vacancies = fetch_vacancies_by_employer_id(employer_id)
-        if employer_vacancies:
-            all_vacancies.extend(employer_vacancies)
-
-    return all_vacancies
+    """Получает список вакансий для указанных ID работодателей, параллельно и со всех страниц."""
+    return VacancyFetcher(max_workers=max_workers).fetch_all(employer_ids)
 
 
 def fetch_vacancies_by_employer_id(employer_id: str) -> List[Dict[str, Any]]:
-    """Получает список вакансий для одного работодателя по его ID."""
-    url = "https://api.hh.ru/vacancies"
-    params = {"employer_id": employer_id}
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()  # Проверка на HTTP ошибки
-
-        vacancies_data = response.json()
-        employer_vacancies = vacancies_data.get("items", [])
+    """Получает список вакансий для одного работодателя по его ID со всех страниц."""
+    return VacancyFetcher().fetch_all([employer_id])
 
-        valid_vacancies = [
-            vacancy_item
-            for vacancy_item in employer_vacancies
-            if is_valid_vacancy(vacancy_item)
-        ]
-        return valid_vacancies
 
-    except requests.exceptions.RequestException as e:
-        print(f"Ошибка при получении вакансий для работодателя с ID {employer_id}: {e}")
-        return []
+def page_vacancies(vacancies_data: Dict[str, Any], as_records: bool = False) -> List[Dict[str, Any]] | List[Vacancy]:
+    """Валидные вакансии страницы ответа hh.ru (при as_records=True — записи Vacancy)."""
+    valid_vacancies = [
+        vacancy_item for vacancy_item in vacancies_data.get("items", []) if is_valid_vacancy(vacancy_item)
+    ]
+    if as_records:
+        return [Vacancy.from_api(vacancy_item) for vacancy_item in valid_vacancies]
+    return valid_vacancies
 
 
 def is_valid_vacancy(vacancy_data: Dict[str, Any]) -> bool:
     """Проверяет, содержит ли вакансия необходимую информацию и имеет ли валидную валюту."""
     return (
-        vacancy_data.get("name") is not None
+        vacancy_data.get("id") is not None
+        and vacancy_data.get("name") is not None
         and vacancy_data["area"].get("name") is not None
         and vacancy_data.get("salary") is not None
         and vacancy_data["salary"].get("currency") is not None
         and vacancy_data["salary"]["currency"] == "RUR"
         and vacancy_data.get("alternate_url") is not None
+        and vacancy_data["employer"].get("id") is not None
         and vacancy_data["employer"].get("name") is not None
     )
 
 
 def fetch_employer_name(employer_id: str) -> str | None:
     """Получает имя работодателя по его ID."""
-    url = f"https://api.hh.ru/employers/{employer_id}"
+    url = f"{API_URL}/employers/{employer_id}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        employer_data = response.json()
+        employer_data = get_scheduler().get_json(url)
         return employer_data.get("name")
     except requests.exceptions.RequestException as e:
         print(f"Ошибка при получении данных о работодателе с ID {employer_id}: {e}")
@@ -67,19 +202,8 @@ def fetch_employer_name(employer_id: str) -> str | None:
 
 
 if __name__ == "__main__":
-    # Список ID конкретных работодателей
-    specific_employer_ids = [
-        "80",
-        "1740",
-        "2460946",
-        "15478",
-        "4233",
-        "59",
-        "1102601",
-        "208707",
-        "1373",
-        "106571",
-    ]
+    # Набор работодателей из файла (HH_EMPLOYERS) или DEFAULT_EMPLOYER_IDS
+    specific_employer_ids = load_employer_ids()
 
     all_fetched_vacancies = fetch_vacancies_for_specific_employers(
         specific_employer_ids
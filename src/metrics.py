@@ -0,0 +1,177 @@
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Порог логирования медленных запросов в миллисекундах (0 — не логировать)
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "500"))
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_SPACES = re.compile(r"\s+")
+_PATH_ID = re.compile(r"/\d+(?=/|$)")
+
+
+def normalize_sql(query: str) -> str:
+    """Приводит SQL к шаблону для меток метрик: литералы и параметры заменяются на '?'."""
+    query = _SQL_STRING.sub("?", query)
+    query = _SQL_NUMBER.sub("?", query)
+    query = query.replace("%s", "?")
+    query = _SQL_SPACES.sub(" ", query).strip()
+    return query[:200]
+
+
+def normalize_endpoint(url: str) -> str:
+    """Приводит URL к эндпоинту без числовых идентификаторов: /employers/80 -> /employers/{id}."""
+    return _PATH_ID.sub("/{id}", urlparse(url).path) or "/"
+
+
+def _escape(value: str) -> str:
+    """Экранирует значение метки в текстовом формате Prometheus."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """Потокобезопасный реестр счётчиков, gauge-метрик и сводок (count/sum) с экспортом в формат Prometheus."""
+
+    def __init__(self):
+        """Инициализирует пустой реестр."""
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._summaries: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict | None) -> tuple:
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name: str, labels: dict | None = None, value: float = 1) -> None:
+        """Увеличивает счётчик."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: dict | None = None) -> None:
+        """Устанавливает значение gauge-метрики."""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, labels: dict | None = None) -> None:
+        """Добавляет наблюдение в сводку (количество и сумма)."""
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    @contextmanager
+    def timer(self, name: str, labels: dict | None = None):
+        """Контекстный менеджер, записывающий длительность блока в секундах."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, labels)
+
+    def render_prometheus(self) -> str:
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted({name for name, _ in metrics}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (metric, labels), value in sorted(metrics.items()):
+                        if metric == name:
+                            lines.append(f"{name}{_format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self._summaries}):
+                lines.append(f"# TYPE {name} summary")
+                for (metric, labels), (count, total) in sorted(self._summaries.items()):
+                    if metric == name:
+                        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+                        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Атомарно записывает метрики в файл (например, для textfile-коллектора node_exporter)."""
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(self.render_prometheus())
+        os.replace(temporary_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Запускает в фоновом потоке HTTP-эндпоинт /metrics."""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def clear(self) -> None:
+        """Сбрасывает все метрики."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def observe_query(query: str, seconds: float, rows: int, error: bool = False) -> None:
+    """Записывает время и число строк SQL-запроса; медленные запросы логируются."""
+    labels = {"query": normalize_sql(query)}
+    REGISTRY.observe("db_query_seconds", seconds, labels)
+    REGISTRY.inc("db_query_rows_total", labels, max(rows, 0))
+    if error:
+        REGISTRY.inc("db_query_errors_total", labels)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Медленный запрос (%.1f мс, строк: %d): %s", seconds * 1000, rows, labels["query"])
+
+
+def observe_http(url: str, status: int | str, seconds: float) -> None:
+    """Записывает задержку и статус HTTP-запроса по эндпоинту."""
+    endpoint = normalize_endpoint(url)
+    REGISTRY.observe("http_request_seconds", seconds, {"endpoint": endpoint})
+    REGISTRY.inc("http_responses_total", {"endpoint": endpoint, "status": str(status)})
+
+
+def start_from_env() -> ThreadingHTTPServer | None:
+    """Запускает эндпоинт /metrics, если задана переменная окружения METRICS_PORT."""
+    port = os.environ.get("METRICS_PORT")
+    if not port:
+        return None
+    return REGISTRY.serve(int(port), os.environ.get("METRICS_HOST", "127.0.0.1"))
+
+
+def write_from_env() -> None:
+    """Записывает метрики в файл, если задана переменная окружения METRICS_FILE."""
+    path = os.environ.get("METRICS_FILE")
+    if path:
+        REGISTRY.write_prometheus(path)
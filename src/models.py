@@ -0,0 +1,110 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, NamedTuple
+
+
+class Vacancy(NamedTuple):
+    """Компактная запись о вакансии: используется и при чтении из БД, и при загрузке из hh.ru.
+
+    Порядок полей совпадает с VACANCY_FIELDS в src.companies_and_vacancies, поэтому
+    строка результата превращается в запись через Vacancy._make(row) без промежуточных словарей.
+    """
+
+    vacancy_id: int
+    employer_id: int
+    name: str
+    employer: str
+    area_id: int | None
+    location: str
+    salary_from: int
+    salary_to: int
+    currency: str
+    url: str
+    published_at: datetime | str | None = None
+    employer_url: str | None = None
+
+    @classmethod
+    def from_api(cls, payload: Dict[str, Any]) -> "Vacancy":
+        """Создаёт запись из вакансии в ответе hh.ru (после проверки is_valid_vacancy)."""
+        salary = payload["salary"]
+        area = payload["area"]
+        employer = payload["employer"]
+        return cls(
+            int(payload["id"]),
+            int(employer["id"]),
+            payload["name"],
+            employer["name"],
+            int(area["id"]) if area.get("id") else None,
+            area["name"],
+            salary["from"] if salary["from"] is not None else 0,
+            salary["to"] if salary["to"] is not None else 0,
+            salary["currency"],
+            payload["alternate_url"],
+            payload.get("published_at"),
+            employer.get("alternate_url"),
+        )
+
+    @property
+    def salary(self) -> str:
+        """Зарплатная вилка в виде строки; форматируется только при обращении."""
+        return f"{self.salary_from} - {self.salary_to} {self.currency}"
+
+    def to_dict(self) -> Dict[str, str]:
+        """Словарь в прежнем формате DBManager (для вывода и сериализации)."""
+        return {
+            "Компания": self.employer,
+            "Вакансия": self.name,
+            "Зарплата": self.salary,
+            "URL": self.url,
+        }
+
+    def to_json(self) -> str:
+        """JSON-представление записи в формате to_dict."""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+class Employer(NamedTuple):
+    """Компактная запись о работодателе и количестве его вакансий."""
+
+    employer_id: int
+    name: str
+    vacancies_count: int | None = None
+    url: str | None = None
+
+    @classmethod
+    def from_api(cls, payload: Dict[str, Any]) -> "Employer":
+        """Создаёт запись из объекта employer в ответе hh.ru."""
+        return cls(int(payload["id"]), payload["name"], payload.get("open_vacancies"), payload.get("alternate_url"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь для вывода и сериализации."""
+        return {"Компания": self.name, "Количество вакансий": self.vacancies_count}
+
+
+class SalaryStats(NamedTuple):
+    """Распределение зарплат группы вакансий: число вакансий с зарплатой, среднее, границы и перцентили."""
+
+    count: int
+    mean: float | None
+    min: float | None
+    max: float | None
+    p25: float | None
+    median: float | None
+    p75: float | None
+    p90: float | None
+
+
+class SalaryGroup(NamedTuple):
+    """Распределение зарплат в разрезе: ключ группы (ID работодателя, город, слово) и его подпись."""
+
+    key: Any
+    label: str
+    stats: SalaryStats
+
+
+class HistogramBin(NamedTuple):
+    """Интервал гистограммы зарплат [lower, upper) и число вакансий в нём."""
+
+    lower: float
+    upper: float
+    count: int
@@ -0,0 +1,150 @@
+import queue
+import threading
+import time
+from typing import Dict, List
+
+from src.database import bulk_load_vacancies, prune_vacancies
+from src.db_queries import DBQueries
+from src.get_vacancies import VacancyFetcher
+from src.metrics import REGISTRY
+from src.models import Vacancy
+
+_DONE = object()  # Маркер окончания потока страниц
+
+
+class StageStats:
+    """Статистика одного этапа конвейера: объём работы и чистое время выполнения."""
+
+    def __init__(self, name: str):
+        """Инициализирует пустую статистику этапа."""
+        self.name = name
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Количество элементов в секунду рабочего времени этапа."""
+        return self.items / self.busy_seconds if self.busy_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.items} шт. за {self.busy_seconds:.2f} с "
+            f"({self.throughput:.0f} шт./с, пакетов: {self.batches})"
+        )
+
+
+class IngestPipeline:
+    """Потоковая загрузка вакансий: страницы hh.ru -> ограниченная очередь -> пакетная запись в БД.
+
+    Загрузка из сети и запись в базу идут параллельно, а объём данных в памяти
+    ограничен размером очереди и пакета, а не числом работодателей.
+    """
+
+    def __init__(
+        self,
+        queries_manager: DBQueries,
+        fetcher: VacancyFetcher | None = None,
+        batch_size: int = 5000,
+        queue_size: int = 32,
+    ):
+        """Инициализирует конвейер с размером пакета записи и ёмкостью очереди страниц."""
+        self.queries_manager = queries_manager
+        self.fetcher = fetcher or VacancyFetcher()
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.fetch_stats = StageStats("Загрузка страниц")
+        self.write_stats = StageStats("Запись в БД")
+        self.counts: Dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def _produce(self, employer_ids: List[str], pages: queue.Queue, stop: threading.Event) -> None:
+        """Поток-производитель: складывает загруженные страницы в очередь, пока не установлен stop."""
+        try:
+            started = time.perf_counter()
+            blocked = 0.0  # Время ожидания места в очереди не считается работой этапа
+            for employer_id, _page, vacancies in self.fetcher.iter_pages(employer_ids, as_records=True):
+                if stop.is_set():
+                    break  # Закрытие генератора останавливает загрузку оставшихся страниц
+                self.fetch_stats.batches += 1
+                self.fetch_stats.items += len(vacancies)
+                put_started = time.perf_counter()
+                pages.put((employer_id, vacancies))  # Блокируется, если запись отстаёт
+                blocked += time.perf_counter() - put_started
+            self.fetch_stats.busy_seconds = time.perf_counter() - started - blocked
+            pages.put(_DONE)
+        except BaseException as e:
+            pages.put(e)
+
+    def _write(self, batch: List[Vacancy]) -> None:
+        """Записывает пакет вакансий в базу и накапливает счётчики."""
+        started = time.perf_counter()
+        counts = bulk_load_vacancies(batch, self.queries_manager)
+        self.write_stats.busy_seconds += time.perf_counter() - started
+        self.write_stats.batches += 1
+        self.write_stats.items += len(batch)
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def run(self, employer_ids: List[str]) -> Dict[str, int]:
+        """Загружает вакансии работодателей и возвращает суммарные счётчики синхронизации.
+
+        Для полностью загруженных работодателей после записи удаляются исчезнувшие вакансии.
+        """
+        self.counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "employers_inserted": 0}
+        started = time.perf_counter()
+        pages: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(employer_ids, pages, stop), daemon=True)
+        producer.start()
+
+        seen_ids: Dict[str, set] = {}
+        batch: List[Vacancy] = []
+        try:
+            while True:
+                item = pages.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                employer_id, vacancies = item
+                seen_ids.setdefault(employer_id, set()).update(vacancy.vacancy_id for vacancy in vacancies)
+                batch.extend(vacancies)
+                if len(batch) >= self.batch_size:
+                    self._write(batch)
+                    batch = []
+            if batch:
+                self._write(batch)
+        finally:
+            # При ошибке записи производитель останавливается, а очередь разбирается,
+            # чтобы он не завис на put и не остался висеть вместе со страницами
+            stop.set()
+            while producer.is_alive():
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
+
+        complete = {
+            int(employer_id): seen_ids.get(employer_id, set())
+            for employer_id in employer_ids
+            if employer_id not in self.fetcher.failed
+        }
+        if complete:
+            self.counts["deleted"] = prune_vacancies(self.queries_manager, complete)
+        self.elapsed = time.perf_counter() - started
+        for stats in (self.fetch_stats, self.write_stats):
+            REGISTRY.set("ingest_stage_throughput", stats.throughput, {"stage": stats.name})
+        REGISTRY.set("ingest_last_run_seconds", self.elapsed)
+        return self.counts
+
+    def report(self) -> str:
+        """Возвращает отчёт о пропускной способности этапов."""
+        return "\n".join(
+            [
+                str(self.fetch_stats),
+                str(self.write_stats),
+                f"Всего: {self.write_stats.items} вакансий за {self.elapsed:.2f} с",
+            ]
+        )
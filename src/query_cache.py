@@ -0,0 +1,140 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+# Поколение данных процесса: увеличивается после каждой успешной загрузки, делая кэш недействительным.
+# Загрузки других процессов (шарды, демон, повторный запуск main.py) видны через счётчик
+# data_generation в базе, который кэш перечитывает не чаще раза в generation_check_interval секунд.
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def current_generation() -> int:
+    """Возвращает текущее поколение данных."""
+    return _generation
+
+
+def bump_generation() -> int:
+    """Увеличивает поколение данных; вызывается функциями загрузки после фиксации изменений."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        return _generation
+
+
+class QueryCache:
+    """LRU-кэш результатов запросов DBManager с TTL и ограничением по числу строк."""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 300.0,
+        max_rows: int = 100_000,
+        generation_check_interval: float = 1.0,
+    ):
+        """Инициализирует кэш: не более max_entries результатов и max_rows строк суммарно."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.generation_check_interval = generation_check_interval
+        self._db_generation = None
+        self._checked_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _size(cls, value: Any) -> int:
+        """Оценивает размер результата в строках."""
+        if isinstance(value, list):
+            return len(value)
+        if isinstance(value, tuple):
+            return sum(cls._size(item) for item in value)
+        return 1
+
+    def generation(self, queries_manager: Any = None) -> tuple:
+        """Возвращает поколение данных: (поколение процесса, поколение в базе).
+
+        Счётчик в базе читается через queries_manager не чаще раза в generation_check_interval секунд.
+        """
+        now = time.monotonic()
+        if queries_manager is not None and now - self._checked_at >= self.generation_check_interval:
+            results = queries_manager.execute_query("SELECT generation FROM data_generation")
+            with self._lock:
+                self._db_generation = results[0][0] if results else None
+                self._checked_at = now
+        return current_generation(), self._db_generation
+
+    def get(self, key: tuple, generation: Any = None) -> tuple[bool, Any]:
+        """Возвращает (найдено, значение); устаревшие и чужого поколения записи удаляются."""
+        if generation is None:
+            generation = self.generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_generation, stored_at, value = entry
+                if stored_generation == generation and time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def put(self, key: tuple, value: Any, generation: Any) -> None:
+        """Сохраняет результат, вытесняя давно не использованные записи при превышении лимитов."""
+        size = self._size(value)
+        if size > self.max_rows:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (generation, time.monotonic(), value)
+            self._rows += size
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple) -> None:
+        """Удаляет запись и уменьшает счётчик строк."""
+        _, _, value = self._entries.pop(key)
+        self._rows -= self._size(value)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+
+def _freeze(value: Any) -> Any:
+    """Делает аргументы метода хешируемыми для ключа кэша."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+def cached_query(method: Callable) -> Callable:
+    """Декоратор метода DBManager (и SalaryAnalytics): отдаёт результат из self.cache, если он задан и актуален."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = getattr(self, "cache", None)
+        if cache is None:
+            return method(self, *args, **kwargs)
+        key = (method.__name__, getattr(self, "keyword", None), _freeze(args), _freeze(sorted(kwargs.items())))
+        # Поколение берётся до запроса, чтобы не закэшировать устаревшее
+        generation = cache.generation(getattr(self, "queries_manager", None))
+        found, value = cache.get(key, generation)
+        if not found:
+            value = method(self, *args, **kwargs)
+            cache.put(key, value, generation)
+        # Копия списка защищает кэш от изменения результата вызывающим кодом
+        return list(value) if isinstance(value, list) else value
+
+    return wrapper
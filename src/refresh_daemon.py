@@ -0,0 +1,424 @@
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+from dotenv import load_dotenv
+
+from src.companies_and_vacancies import MAX_PAGE_SIZE, DBManager
+from src.database import create_database, ensure_schema
+from src.db_connection import create_connection
+from src.db_queries import DBQueries
+from src.employer_sets import load_employer_ids
+from src.get_vacancies import DEFAULT_CONCURRENCY, VacancyFetcher, get_session
+from src.metrics import REGISTRY, start_from_env
+from src.pipeline import IngestPipeline
+from src.query_cache import QueryCache
+from src.request_scheduler import RequestScheduler
+from src.response_cache import DEFAULT_TTLS, ResponseCache
+from src.snapshots import SnapshotArchive
+
+# Границы интервала обновления работодателя, секунды
+MIN_INTERVAL = float(os.environ.get("REFRESH_MIN_INTERVAL", "300"))
+MAX_INTERVAL = float(os.environ.get("REFRESH_MAX_INTERVAL", str(6 * 3600)))
+# Интервал уменьшается вдвое, если вакансии работодателя изменились, и растёт в полтора раза, если нет
+SHRINK_FACTOR = 0.5
+GROW_FACTOR = 1.5
+
+
+class RefreshSchedule:
+    """Расписание обновления работодателей с интервалами по частоте изменений их вакансий.
+
+    Работодатель, у которого при обновлении что-то изменилось, обновляется чаще (интервал
+    уменьшается до min_interval), неизменный — реже (до max_interval). Расписание сохраняется
+    в файл path, поэтому после перезапуска интервалы не приходится подбирать заново.
+    """
+
+    def __init__(
+        self,
+        employer_ids: List[str],
+        min_interval: float = MIN_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        path: str | None = None,
+    ):
+        """Загружает сохранённое расписание; новые работодатели обновляются сразу."""
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Некорректные границы интервала обновления")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.path = path or os.path.join(".cache", "refresh_schedule.json")
+        self._lock = threading.Lock()
+        saved = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as file:
+                saved = json.load(file)
+        self.employers: Dict[str, Dict[str, Any]] = {}
+        for employer_id in map(str, employer_ids):
+            entry = saved.get(employer_id) or {"next_due": 0.0, "last_refresh": None, "refreshes": 0, "changes": 0}
+            entry["interval"] = min(max(entry.get("interval", min_interval), min_interval), max_interval)
+            self.employers[employer_id] = entry
+
+    def save(self) -> None:
+        """Атомарно записывает расписание в файл."""
+        with self._lock:
+            data = json.dumps(self.employers, ensure_ascii=False)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        partial = f"{self.path}.part"
+        with open(partial, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(partial, self.path)
+
+    def due(self, now: float) -> List[str]:
+        """Работодатели, которым пора обновиться."""
+        with self._lock:
+            return [employer_id for employer_id, entry in self.employers.items() if entry["next_due"] <= now]
+
+    def next_due(self) -> float | None:
+        """Время ближайшего обновления."""
+        with self._lock:
+            return min((entry["next_due"] for entry in self.employers.values()), default=None)
+
+    def record(self, employer_id: str, changed: bool | None, now: float) -> None:
+        """Подстраивает интервал после обновления; changed=None — загрузка не удалась, повтор через min_interval."""
+        with self._lock:
+            entry = self.employers[employer_id]
+            if changed is None:
+                entry["next_due"] = now + self.min_interval
+                return
+            factor = SHRINK_FACTOR if changed else GROW_FACTOR
+            entry["interval"] = min(max(entry["interval"] * factor, self.min_interval), self.max_interval)
+            entry["next_due"] = now + entry["interval"]
+            entry["last_refresh"] = now
+            entry["refreshes"] += 1
+            entry["changes"] += int(changed)
+
+    def request(self, employer_ids: List[str] | None = None) -> List[str]:
+        """Назначает внеочередное обновление работодателей (по умолчанию всех); возвращает известных из них."""
+        with self._lock:
+            employer_ids = list(self.employers) if employer_ids is None else [
+                employer_id for employer_id in map(str, employer_ids) if employer_id in self.employers
+            ]
+            for employer_id in employer_ids:
+                self.employers[employer_id]["next_due"] = 0.0
+            return employer_ids
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Состояние расписания по работодателям (для /status)."""
+        with self._lock:
+            return [{"employer_id": employer_id, **entry} for employer_id, entry in self.employers.items()]
+
+
+class RefreshDaemon:
+    """Постоянно работающая служба: обновляет вакансии по расписанию на тёплом пуле подключений и HTTP-сессии.
+
+    Схема проверяется один раз при запуске, а не при каждом обновлении. Обновление загружает
+    только работодателей, которым подошёл срок (см. RefreshSchedule); страницы hh.ru
+    перепроверяются условными запросами кэша ответов, а в базу записываются только изменения.
+    """
+
+    def __init__(
+        self,
+        queries_manager: DBQueries,
+        schedule: RefreshSchedule,
+        fetcher: VacancyFetcher | None = None,
+        batch_size: int = 5000,
+    ):
+        """Инициализирует службу; по умолчанию загрузчик использует общую HTTP-сессию и архив снимков."""
+        self.queries_manager = queries_manager
+        self.schedule = schedule
+        self.fetcher = fetcher or default_fetcher()
+        self.batch_size = batch_size
+        self.cache = QueryCache()  # Общий кэш результатов API; сбрасывается при изменении данных
+        self.last_cycle: Dict[str, Any] | None = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._refresh_lock = threading.Lock()
+
+    def _fingerprints(self, employer_ids: List[str]) -> Dict[str, tuple]:
+        """Отпечаток вакансий работодателей: число строк и время последнего изменения (synced_at)."""
+        condition, params = self.queries_manager.dialect.in_list("employer_id", [int(i) for i in employer_ids])
+        results = self.queries_manager.execute_query(
+            f"SELECT employer_id, COUNT(*), MAX(synced_at) FROM vacancies WHERE {condition} GROUP BY employer_id",
+            params,
+        )
+        return {str(row[0]): (row[1], str(row[2])) for row in results}
+
+    def refresh(self, employer_ids: List[str]) -> Dict[str, Any]:
+        """Обновляет вакансии работодателей и подстраивает их интервалы; возвращает итог цикла."""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            before = self._fingerprints(employer_ids)
+            pipeline = IngestPipeline(self.queries_manager, fetcher=self.fetcher, batch_size=self.batch_size)
+            counts = pipeline.run(employer_ids)
+            after = self._fingerprints(employer_ids)
+
+            now = time.time()
+            failed = {str(employer_id) for employer_id in self.fetcher.failed}
+            changed = [
+                employer_id
+                for employer_id in employer_ids
+                if employer_id not in failed and before.get(employer_id) != after.get(employer_id)
+            ]
+            for employer_id in employer_ids:
+                self.schedule.record(
+                    employer_id, None if employer_id in failed else employer_id in changed, now
+                )
+            self.schedule.save()
+
+            seconds = time.perf_counter() - started
+            self.last_cycle = {
+                "finished_at": datetime.now().isoformat(timespec="seconds"),
+                "employers": len(employer_ids),
+                "changed": len(changed),
+                "failed": sorted(failed),
+                "vacancies": pipeline.write_stats.items,
+                "seconds": round(seconds, 3),
+                **counts,
+            }
+            REGISTRY.observe("refresh_cycle_seconds", seconds)
+            unchanged = len(employer_ids) - len(changed) - len(failed)
+            for result, count in (("changed", len(changed)), ("failed", len(failed)), ("unchanged", unchanged)):
+                REGISTRY.inc("refresh_employers_total", {"result": result}, count)
+            print(
+                f"Обновлено работодателей: {len(employer_ids)} за {seconds:.2f} с, изменились: {len(changed)}, "
+                f"добавлено {counts['inserted']}, обновлено {counts['updated']}, удалено {counts['deleted']}"
+            )
+            return self.last_cycle
+
+    def run_once(self) -> Dict[str, Any] | None:
+        """Обновляет работодателей, которым подошёл срок; None, если таких нет."""
+        due = self.schedule.due(time.time())
+        if not due:
+            return None
+        return self.refresh(due)
+
+    def run_forever(self) -> None:
+        """Обновляет работодателей по расписанию до вызова stop()."""
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                # Служба не падает из-за одного неудачного цикла: ошибка базы или сети повторится позже
+                print(f"Ошибка обновления вакансий: {e}")
+                self._stopped.wait(self.schedule.min_interval)
+                continue
+            next_due = self.schedule.next_due()
+            timeout = self.schedule.max_interval if next_due is None else max(next_due - time.time(), 0)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def wake(self, employer_ids: List[str] | None = None) -> List[str]:
+        """Запускает внеочередное обновление работодателей (по умолчанию всех)."""
+        employer_ids = self.schedule.request(employer_ids)
+        self._wake.set()
+        return employer_ids
+
+    def stop(self) -> None:
+        """Останавливает цикл обновления после текущего цикла."""
+        self._stopped.set()
+        self._wake.set()
+
+    def manager(self, keyword: str = "") -> DBManager:
+        """DBManager на тёплом пуле с общим кэшем результатов."""
+        return DBManager(keyword, self.queries_manager, self.cache)
+
+    def status(self) -> Dict[str, Any]:
+        """Состояние службы: итог последнего цикла и расписание работодателей."""
+        return {"last_cycle": self.last_cycle, "employers": self.schedule.status()}
+
+
+def default_fetcher() -> VacancyFetcher:
+    """Загрузчик службы с общей HTTP-сессией.
+
+    Кэш ответов /vacancies не отдаёт страницы без сети (TTL 0), а всегда перепроверяет их
+    условным запросом: неизменная страница приходит ответом 304 без тела.
+    Снимки циклов пишутся, только если задана HH_DAEMON_SNAPSHOTS — сколько последних хранить.
+    """
+    cache = None if os.environ.get("HH_CACHE_DISABLED") else ResponseCache(ttls={**DEFAULT_TTLS, "/vacancies": 0.0})
+    scheduler = RequestScheduler(session=get_session(), max_concurrency=DEFAULT_CONCURRENCY, cache=cache)
+    archive = None
+    keep = os.environ.get("HH_DAEMON_SNAPSHOTS")
+    if keep and not os.environ.get("HH_SNAPSHOTS_DISABLED"):
+        if not keep.isdigit():
+            raise ValueError(f"Некорректное значение HH_DAEMON_SNAPSHOTS: {keep}")
+        archive = SnapshotArchive(keep=int(keep))
+    return VacancyFetcher(scheduler=scheduler, archive=archive)
+
+
+def _jsonable(value: Any) -> Any:
+    """Сериализует записи и значения из базы для ответа API."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _records(records: list) -> List[Dict[str, Any]]:
+    """Записи NamedTuple (Vacancy, Employer) в словари полей."""
+    return [record._asdict() for record in records]
+
+
+def _param(
+    query: Dict[str, List[str]],
+    name: str,
+    default: Any = None,
+    kind: Callable = str,
+    minimum: Any = None,
+    maximum: Any = None,
+) -> Any:
+    """Значение параметра запроса; ValueError, если его нельзя привести к kind или оно вне [minimum, maximum]."""
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = kind(values[0])
+    except ValueError:
+        raise ValueError(f"Некорректное значение параметра {name}: {values[0]}") from None
+    if minimum is not None and value < minimum:
+        raise ValueError(f"Параметр {name} должен быть не меньше {minimum}: {values[0]}")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"Параметр {name} должен быть не больше {maximum}: {values[0]}")
+    return value
+
+
+def _api_routes(daemon: RefreshDaemon) -> Dict[tuple, Callable]:
+    """Обработчики API: (метод, путь) -> функция от параметров запроса."""
+
+    def vacancies(query):
+        vacancies, next_after = daemon.manager().get_vacancies_page(
+            _param(query, "after", kind=int, minimum=0), _param(query, "limit", 100, int, 1, MAX_PAGE_SIZE)
+        )
+        return {"vacancies": _records(vacancies), "next_after": next_after}
+
+    def search(query):
+        mode, limit = _param(query, "mode", "and"), _param(query, "limit", 50, int, 1, MAX_PAGE_SIZE)
+        return _records(daemon.manager().search_vacancies(query.get("q", []), mode, limit))
+
+    def keyword(query):
+        word = _param(query, "keyword")
+        if not word:
+            raise ValueError("Не задан параметр keyword")
+        return _records(daemon.manager(word).get_vacancies_with_keyword())
+
+    def refresh(query):
+        employer_ids = query.get("employer_id")
+        return {"scheduled": daemon.wake(employer_ids)}
+
+    def higher_salary(query):
+        return _records(daemon.manager().get_vacancies_with_higher_salary())
+
+    return {
+        ("GET", "/companies"): lambda query: _records(daemon.manager().get_companies_and_vacancies_count()),
+        ("GET", "/vacancies"): vacancies,
+        ("GET", "/vacancies/higher-salary"): higher_salary,
+        ("GET", "/vacancies/keyword"): keyword,
+        ("GET", "/vacancies/search"): search,
+        ("GET", "/avg-salary"): lambda query: {"avg_salary": daemon.manager().get_avg_salary()},
+        ("GET", "/status"): lambda query: daemon.status(),
+        ("POST", "/refresh"): refresh,
+    }
+
+
+def serve_api(daemon: RefreshDaemon, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Запускает в фоновом потоке локальный HTTP API с запросами DBManager (ответы в JSON) и /metrics."""
+    routes = _api_routes(daemon)
+
+    class ApiHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, value: Any) -> None:
+            body = json.dumps(value, ensure_ascii=False, default=_jsonable).encode("utf-8")
+            self._send(status, body, "application/json; charset=utf-8")
+
+        def _handle(self, method: str) -> None:
+            url = urlsplit(self.path)
+            if method == "GET" and url.path == "/metrics":
+                body = REGISTRY.render_prometheus().encode("utf-8")
+                self._send(200, body, "text/plain; version=0.0.4; charset=utf-8")
+                return
+            handler = routes.get((method, url.path))
+            if handler is None:
+                self._send_json(404, {"error": f"Неизвестный запрос: {method} {url.path}"})
+                return
+            started = time.perf_counter()
+            try:
+                self._send_json(200, handler(parse_qs(url.query)))
+                status = 200
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                status = 400
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                status = 500
+            REGISTRY.observe("api_request_seconds", time.perf_counter() - started, {"path": url.path})
+            REGISTRY.inc("api_responses_total", {"path": url.path, "status": str(status)})
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Запускает службу обновления вакансий с локальным HTTP API."""
+    parser = argparse.ArgumentParser(description="Служба обновления вакансий hh.ru по расписанию с HTTP API")
+    parser.add_argument(
+        "--employers",
+        metavar="SOURCE",
+        help="набор работодателей: файл (JSON, CSV или список ID) или db — все из таблицы employers",
+    )
+    parser.add_argument("--host", default=os.environ.get("API_HOST", "127.0.0.1"), help="адрес HTTP API")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", "8000")), help="порт HTTP API")
+    parser.add_argument("--min-interval", type=float, default=MIN_INTERVAL, help="минимальный интервал обновления, с")
+    parser.add_argument("--max-interval", type=float, default=MAX_INTERVAL, help="максимальный интервал обновления, с")
+    args = parser.parse_args()
+
+    load_dotenv()
+    start_from_env()
+    db_queries = DBQueries(create_connection())
+    try:
+        create_database(db_queries)
+        print(ensure_schema(db_queries))
+        employer_ids = load_employer_ids(args.employers, db_queries)
+        schedule = RefreshSchedule(employer_ids, args.min_interval, args.max_interval)
+        daemon = RefreshDaemon(db_queries, schedule)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка запуска службы: {e}")
+        db_queries.close()
+        return
+
+    server = serve_api(daemon, args.port, args.host)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: daemon.stop())
+    print(f"Служба запущена: работодателей {len(employer_ids)}, API http://{args.host}:{server.server_port}")
+    try:
+        daemon.run_forever()
+    finally:
+        server.shutdown()
+        db_queries.close()
+        print("Служба остановлена")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+import requests
+
+from src.metrics import REGISTRY, normalize_endpoint, observe_http
+from src.response_cache import ResponseCache
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """Ограничивает частоту запросов алгоритмом token bucket."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        """Инициализирует ведро: rate токенов в секунду, не более capacity в запасе."""
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Блокирует поток, пока не появится свободный токен."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Приостанавливает выдачу токенов всем потокам (например, по заголовку Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+class RequestScheduler:
+    """Общий планировщик HTTP-запросов к hh.ru с ограничением частоты, повторами и AIMD-регулировкой."""
+
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        rate: float | None = None,
+        burst: float | None = None,
+        max_concurrency: int | None = None,
+        min_concurrency: int = 1,
+        max_retries: int | None = None,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = 30.0,
+        cache: ResponseCache | None = None,
+    ):
+        """Инициализирует планировщик из аргументов или переменных окружения."""
+        self.session = session or requests.Session()
+        self.bucket = TokenBucket(
+            rate if rate is not None else float(os.environ.get("HH_RATE_LIMIT", "10")), burst
+        )
+        self.max_concurrency = max_concurrency or int(os.environ.get("HH_CONCURRENCY", "8"))
+        self.min_concurrency = min(min_concurrency, self.max_concurrency)
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("HH_MAX_RETRIES", "5"))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.cache = cache
+
+        # Текущий предел параллельности: растёт аддитивно при успехах и делится пополам при ошибках
+        self.concurrency_limit = float(self.max_concurrency)
+        self.retries = 0
+        self._active = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def _acquire_slot(self) -> None:
+        """Ждёт, пока число выполняющихся запросов не станет меньше текущего предела."""
+        with self._condition:
+            while self._active >= int(self.concurrency_limit):
+                self._condition.wait()
+            self._active += 1
+
+    def _release_slot(self, success: bool) -> None:
+        """Освобождает слот и корректирует предел параллельности (AIMD)."""
+        with self._condition:
+            self._active -= 1
+            now = time.monotonic()
+            if success:
+                self.concurrency_limit = min(
+                    self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit
+                )
+            elif now - self._last_decrease > 1.0:
+                # Серия одновременных ошибок уменьшает предел только один раз
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+                self._last_decrease = now
+            self._condition.notify_all()
+
+    def _backoff(self, attempt: int) -> float:
+        """Экспоненциальная задержка с полным джиттером."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    @staticmethod
+    def retry_after(response: requests.Response | None) -> float | None:
+        """Разбирает заголовок Retry-After (секунды или HTTP-дата)."""
+        if response is None:
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Выполняет запрос, повторяя его при 429/5xx и сетевых ошибках."""
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self._acquire_slot()
+            response = None
+            error = None
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            finally:
+                self._release_slot(response is not None and response.status_code not in RETRY_STATUSES)
+                status = response.status_code if response is not None else type(error).__name__
+                observe_http(url, status, time.perf_counter() - started)
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+            if attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self.retry_after(response)
+            if delay is not None:
+                self.bucket.pause(delay)  # Сервер явно просит подождать всех
+            else:
+                delay = self._backoff(attempt)
+            attempt += 1
+            with self._condition:
+                self.retries += 1
+            REGISTRY.inc("http_retries_total", {"endpoint": normalize_endpoint(url)})
+            time.sleep(delay)
+
+    def get_json(self, url: str, params: dict | None = None) -> Any:
+        """Выполняет GET-запрос и возвращает разобранный JSON; при ошибке HTTP бросает исключение.
+
+        При подключённом кэше свежий ответ отдаётся без сети, а устаревший
+        перепроверяется условным запросом (If-None-Match / If-Modified-Since).
+        """
+        if self.cache is None:
+            response = self.request("GET", url, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        key = self.cache.make_key(url, params)
+        entry = None if self.cache.bypass else self.cache.get(key)
+        headers = {}
+        cache_labels = {"endpoint": normalize_endpoint(url)}
+        if entry is not None:
+            if self.cache.is_fresh(entry, url):
+                REGISTRY.inc("http_cache_total", {**cache_labels, "result": "fresh"})
+                return json.loads(entry.body)
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        response = self.request("GET", url, params=params, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            REGISTRY.inc("http_cache_total", {**cache_labels, "result": "revalidated"})
+            self.cache.touch(key)
+            return json.loads(entry.body)
+        REGISTRY.inc("http_cache_total", {**cache_labels, "result": "miss"})
+        response.raise_for_status()
+        self.cache.put(key, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.json()
@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+from urllib.parse import urlencode, urlparse
+
+DEFAULT_TTLS = {
+    "/vacancies": float(os.environ.get("HH_CACHE_TTL_VACANCIES", "900")),
+    "/employers": float(os.environ.get("HH_CACHE_TTL_EMPLOYERS", "86400")),
+}
+
+
+class CachedResponse(NamedTuple):
+    """Сохранённый ответ API с валидаторами для условного запроса."""
+
+    body: str
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+
+
+class ResponseCache:
+    """Постоянный кэш HTTP-ответов в SQLite с TTL по эндпоинтам и LRU-вытеснением по размеру."""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttls: dict[str, float] | None = None,
+        max_bytes: int | None = None,
+        bypass: bool | None = None,
+    ):
+        """Открывает (или создаёт) файл кэша; параметры по умолчанию берутся из переменных окружения."""
+        self.path = path or os.environ.get("HH_CACHE_PATH", os.path.join(".cache", "hh_responses.sqlite3"))
+        self.ttls = ttls if ttls is not None else dict(DEFAULT_TTLS)
+        self.max_bytes = (
+            max_bytes if max_bytes is not None else int(float(os.environ.get("HH_CACHE_MAX_MB", "200")) * 2**20)
+        )
+        # В режиме bypass кэш не читается, но свежие ответы в него по-прежнему записываются
+        self.bypass = bypass if bypass is not None else os.environ.get("HH_CACHE_BYPASS", "") not in ("", "0")
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # Файл кэша общий для процессов пула шардов: при блокировке запись ждёт, а не падает с ошибкой
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    @staticmethod
+    def make_key(url: str, params: dict | None = None) -> str:
+        """Строит ключ кэша из URL и отсортированных параметров запроса."""
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+    def ttl_for(self, url: str) -> float:
+        """Возвращает TTL эндпоинта: по самому длинному совпадающему префиксу пути."""
+        path = urlparse(url).path
+        matches = [prefix for prefix in self.ttls if path.startswith(prefix)]
+        return self.ttls[max(matches, key=len)] if matches else 0.0
+
+    def is_fresh(self, entry: CachedResponse, url: str) -> bool:
+        """Проверяет, можно ли отдать ответ без обращения к сети."""
+        return time.time() - entry.stored_at < self.ttl_for(url)
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Возвращает сохранённый ответ и отмечает обращение к нему для LRU."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return CachedResponse(*row)
+
+    def put(self, key: str, body: str, etag: str | None = None, last_modified: str | None = None) -> None:
+        """Сохраняет ответ и при превышении лимита вытесняет давно не использованные записи."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO responses (key, body, etag, last_modified, stored_at, last_access, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    body = excluded.body,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    stored_at = excluded.stored_at,
+                    last_access = excluded.last_access,
+                    size = excluded.size
+                """,
+                (key, body, etag, last_modified, now, now, len(body.encode("utf-8"))),
+            )
+            self._evict()
+
+    def touch(self, key: str) -> None:
+        """Продлевает срок жизни записи после ответа 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key)
+            )
+
+    def _evict(self) -> None:
+        """Удаляет самые давно использованные записи, пока кэш не уложится в max_bytes."""
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+
+    def clear(self) -> None:
+        """Удаляет все сохранённые ответы."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        """Закрывает файл кэша."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,275 @@
+from typing import Any, Iterable, Sequence
+
+from src.companies_and_vacancies import VACANCIES_FROM, like_pattern
+from src.models import HistogramBin, SalaryGroup, SalaryStats
+from src.query_cache import QueryCache, cached_query
+
+# Перцентили, возвращаемые в SalaryStats (p25, median, p75, p90)
+STATS_FRACTIONS = (0.25, 0.5, 0.75, 0.9)
+# Позиция медианы в строке результата: ключ, подпись, count, mean, min, max, p25, median
+MEDIAN_COLUMN = 8
+
+# Оценка зарплаты вакансии; 0 в salary_from/salary_to означает, что граница вилки не указана.
+# midpoint — середина вилки, а при одной границе — она сама; from/to — только указанная граница.
+SALARY_BASES = {
+    "midpoint": """
+        CASE
+            WHEN v.salary_from > 0 AND v.salary_to > 0 THEN {half_sum}
+            WHEN v.salary_from > 0 THEN {salary_from}
+            WHEN v.salary_to > 0 THEN {salary_to}
+        END
+    """,
+    "from": "CASE WHEN v.salary_from > 0 THEN {salary_from} END",
+    "to": "CASE WHEN v.salary_to > 0 THEN {salary_to} END",
+}
+
+
+def salary_expression(dialect, basis: str = "midpoint") -> str:
+    """SQL-выражение оценки зарплаты вакансии v (дробного типа; NULL, если зарплата не указана)."""
+    if basis not in SALARY_BASES:
+        raise ValueError(f"Неизвестная оценка зарплаты: {basis}")
+    return SALARY_BASES[basis].format(
+        half_sum=f"{dialect.decimal('v.salary_from + v.salary_to')} / 2",
+        salary_from=dialect.decimal("v.salary_from"),
+        salary_to=dialect.decimal("v.salary_to"),
+    )
+
+
+def vacancy_filters(
+    dialect,
+    employer_ids: Iterable[int] | None = None,
+    location: str | None = None,
+    keyword: str | None = None,
+    salary_min: float | None = None,
+    salary_max: float | None = None,
+    basis: str = "midpoint",
+) -> tuple[list[str], list]:
+    """Условия отбора вакансий v и их параметры.
+
+    employer_ids — ID работодателей hh.ru, keyword — подстрока в названии без учёта регистра,
+    salary_min/salary_max — границы оценки зарплаты basis включительно.
+    """
+    conditions, params = [], []
+    if employer_ids is not None:
+        condition, values = dialect.in_list("v.employer_id", sorted({int(i) for i in employer_ids}))
+        conditions.append(condition)
+        params.extend(values)
+    if location is not None:
+        conditions.append("v.location = %s")
+        params.append(location)
+    if keyword is not None:
+        conditions.append(dialect.ilike("v.name_vacancy"))
+        params.append(like_pattern(keyword))
+    if salary_min is not None:
+        conditions.append(f"{salary_expression(dialect, basis)} >= %s")
+        params.append(salary_min)
+    if salary_max is not None:
+        conditions.append(f"{salary_expression(dialect, basis)} <= %s")
+        params.append(salary_max)
+    return conditions, params
+
+
+def _number(value: Any) -> float | None:
+    """Приводит Decimal и целые из результата запроса к float."""
+    return float(value) if value is not None else None
+
+
+class SalaryAnalytics:
+    """Аналитика зарплат: перцентили, гистограммы и разрезы по работодателям, городам и словам.
+
+    Всё считается в базе одним запросом на результат (percentile_cont, а в SQLite — оконные
+    функции), поэтому в Python приходят только агрегаты, а не строки вакансий.
+    Методы принимают фильтры vacancy_filters (employer_ids, location, keyword, salary_min,
+    salary_max) и оценку зарплаты basis (см. SALARY_BASES) и возвращают числа, а не строки.
+    """
+
+    def __init__(self, queries_manager, cache: QueryCache | None = None):
+        """Инициализирует аналитику с экземпляром DBQueries и необязательным кэшем результатов."""
+        self.queries_manager = queries_manager
+        self.cache = cache
+
+    @property
+    def dialect(self):
+        return self.queries_manager.dialect
+
+    def _base(
+        self, group_key: str, group_label: str, basis: str, extra: tuple[str, tuple] | None = None, **filters
+    ) -> tuple[str, tuple]:
+        """SELECT ключа группы, подписи и оценки зарплаты по вакансиям, прошедшим фильтры (см. vacancy_filters)."""
+        conditions, params = vacancy_filters(self.dialect, basis=basis, **filters)
+        if extra is not None:
+            conditions.append(extra[0])
+            params.extend(extra[1])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        salary = salary_expression(self.dialect, basis)
+        query = f"""
+            SELECT {group_key} AS group_key, {group_label} AS group_label, {salary} AS salary
+            FROM {VACANCIES_FROM}
+            {where}
+        """
+        return query, tuple(params)
+
+    def _window_percentile(self, fraction: float) -> str:
+        """percentile_cont через номер строки в группе: линейная интерполяция между соседними значениями."""
+        position = f"{fraction!r} * (n - 1)"
+        lower = self.dialect.floor(position)
+        return f"""
+            SUM(CASE
+                WHEN rn = {lower} THEN salary * (1 - ({position} - {lower}))
+                WHEN rn = {lower} + 1 THEN salary * ({position} - {lower})
+                ELSE 0
+            END)
+        """
+
+    def _stats_query(self, base: str, fractions: Sequence[float], tail: str = "") -> str:
+        """Запрос распределения по группам base: count, mean, min, max и перцентили fractions."""
+        for fraction in fractions:
+            if not 0 <= fraction <= 1:
+                raise ValueError(f"Перцентиль должен быть от 0 до 1: {fraction}")
+        fractions = [float(fraction) for fraction in fractions]
+        if self.dialect.ordered_set_aggregates:
+            ranked = ""
+            source = "base WHERE salary IS NOT NULL"
+            percentiles = [f"percentile_cont({fraction!r}) WITHIN GROUP (ORDER BY salary)" for fraction in fractions]
+        else:
+            ranked = """,
+            ranked AS (
+                SELECT
+                    group_key, group_label, salary,
+                    ROW_NUMBER() OVER (PARTITION BY group_key ORDER BY salary) - 1 AS rn,
+                    COUNT(*) OVER (PARTITION BY group_key) AS n
+                FROM base
+                WHERE salary IS NOT NULL
+            )"""
+            source = "ranked"
+            percentiles = [self._window_percentile(fraction) for fraction in fractions]
+        return f"""
+            WITH base AS ({base}){ranked}
+            SELECT group_key, group_label, COUNT(*), AVG(salary), MIN(salary), MAX(salary), {", ".join(percentiles)}
+            FROM {source}
+            GROUP BY group_key, group_label
+            {tail}
+        """
+
+    @staticmethod
+    def _stats(row: tuple) -> SalaryStats:
+        """SalaryStats из строки _stats_query с перцентилями STATS_FRACTIONS."""
+        return SalaryStats(int(row[2]), *(_number(value) for value in row[3:]))
+
+    def _groups(self, base: tuple[str, tuple], min_count: int, limit: int | None) -> list[tuple]:
+        """Строки разреза: группы не меньше min_count вакансий, по убыванию медианы."""
+        query, params = base
+        tail = f"HAVING COUNT(*) >= %s ORDER BY {MEDIAN_COLUMN} DESC, 1"
+        params += (min_count,)
+        if limit is not None:
+            tail += " LIMIT %s"
+            params += (limit,)
+        return self.queries_manager.execute_query(self._stats_query(query, STATS_FRACTIONS, tail), params)
+
+    @cached_query
+    def summary(self, *, basis: str = "midpoint", **filters) -> SalaryStats:
+        """Распределение зарплат по всем вакансиям, прошедшим фильтры."""
+        query, params = self._base("0", "''", basis, **filters)
+        results = self.queries_manager.execute_query(self._stats_query(query, STATS_FRACTIONS), params)
+        if not results:
+            return SalaryStats(0, None, None, None, None, None, None, None)
+        return self._stats(results[0])
+
+    @cached_query
+    def percentiles(
+        self, fractions: Sequence[float], *, basis: str = "midpoint", **filters
+    ) -> dict[float, float | None]:
+        """Произвольные перцентили зарплат (fractions — доли от 0 до 1), например {0.5: медиана}."""
+        fractions = list(fractions)
+        if not fractions:
+            return {}
+        query, params = self._base("0", "''", basis, **filters)
+        results = self.queries_manager.execute_query(self._stats_query(query, fractions), params)
+        values = results[0][6:] if results else [None] * len(fractions)
+        return {fraction: _number(value) for fraction, value in zip(fractions, values)}
+
+    @cached_query
+    def histogram(
+        self,
+        bins: int = 10,
+        lower: float | None = None,
+        upper: float | None = None,
+        *,
+        basis: str = "midpoint",
+        **filters,
+    ) -> list[HistogramBin]:
+        """Гистограмма зарплат из bins равных интервалов между lower и upper (по умолчанию — min и max).
+
+        Последний интервал включает upper; зарплаты вне [lower, upper] не учитываются.
+        """
+        if bins < 1:
+            raise ValueError("Число интервалов гистограммы должно быть положительным")
+        if lower is None or upper is None:
+            query, params = self._base("0", "''", basis, **filters)
+            results = self.queries_manager.execute_query(
+                f"SELECT MIN(salary), MAX(salary) FROM ({query}) base WHERE salary IS NOT NULL", params
+            )
+            low, high = results[0] if results else (None, None)
+            if low is None:
+                return []
+            lower = float(low) if lower is None else lower
+            upper = float(high) if upper is None else upper
+        lower, upper = float(lower), float(upper)
+        if upper <= lower:
+            upper = lower + 1
+        width = (upper - lower) / bins
+
+        query, params = self._base("0", "''", basis, **filters)
+        bucket = self.dialect.floor(f"(salary - {lower!r}) / {width!r}")
+        results = self.queries_manager.execute_query(
+            f"""
+            SELECT CASE WHEN salary >= {upper!r} THEN {bins - 1} ELSE {bucket} END AS bucket, COUNT(*)
+            FROM ({query}) base
+            WHERE salary >= {lower!r} AND salary <= {upper!r}
+            GROUP BY 1
+            """,
+            params,
+        )
+        counts = {int(bucket): count for bucket, count in results}
+        return [
+            HistogramBin(lower + index * width, lower + (index + 1) * width, counts.get(index, 0))
+            for index in range(bins)
+        ]
+
+    @cached_query
+    def by_employer(
+        self, min_count: int = 1, limit: int | None = None, *, basis: str = "midpoint", **filters
+    ) -> list[SalaryGroup]:
+        """Распределение зарплат по работодателям (ключ — ID hh.ru) по убыванию медианы."""
+        base = self._base("v.employer_id", "e.name", basis, **filters)
+        return [SalaryGroup(row[0], row[1], self._stats(row)) for row in self._groups(base, min_count, limit)]
+
+    @cached_query
+    def by_location(
+        self, min_count: int = 1, limit: int | None = None, *, basis: str = "midpoint", **filters
+    ) -> list[SalaryGroup]:
+        """Распределение зарплат по городам по убыванию медианы."""
+        base = self._base("v.location", "v.location", basis, **filters)
+        return [SalaryGroup(row[0], row[1], self._stats(row)) for row in self._groups(base, min_count, limit)]
+
+    @cached_query
+    def by_keyword(
+        self, keywords: Sequence[str], min_count: int = 1, *, basis: str = "midpoint", **filters
+    ) -> list[SalaryGroup]:
+        """Распределение зарплат вакансий, в названии которых есть каждое из слов, по убыванию медианы.
+
+        Вакансия с несколькими словами учитывается в каждой из их групп.
+        """
+        keywords = [keyword for keyword in keywords if keyword.strip()]
+        if not keywords:
+            return []
+        ilike = self.dialect.ilike("v.name_vacancy")
+        parts, params = [], ()
+        for index, keyword in enumerate(keywords):
+            query, part_params = self._base(
+                str(index), "''", basis, extra=(ilike, (like_pattern(keyword),)), **filters
+            )
+            parts.append(query)
+            params += part_params
+        rows = self._groups((" UNION ALL ".join(parts), params), min_count, None)
+        return [SalaryGroup(keywords[row[0]], keywords[row[0]], self._stats(row)) for row in rows]
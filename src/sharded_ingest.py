@@ -0,0 +1,288 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, NamedTuple
+
+from src.db_connection import create_connection
+from src.db_queries import DBQueries
+from src.get_vacancies import API_URL, VacancyFetcher, get_session
+from src.metrics import REGISTRY
+from src.pipeline import IngestPipeline
+from src.query_cache import bump_generation
+from src.request_scheduler import RequestScheduler
+from src.response_cache import ResponseCache
+from src.snapshots import SnapshotArchive, SnapshotRun
+
+COUNT_KEYS = ("inserted", "updated", "unchanged", "deleted", "employers_inserted")
+
+
+class ShardTask(NamedTuple):
+    """Задание процессу-исполнителю: шард работодателей и всё, что нужно для своего подключения."""
+
+    shard_id: int
+    employer_ids: List[str]
+    backend: str | None
+    db_path: str | None
+    api_url: str
+    rate: float
+    batch_size: int
+    snapshot_root: str | None
+    snapshot_run_id: str | None
+
+
+class ShardResult(NamedTuple):
+    """Итог загрузки шарда: счётчики синхронизации, объём, время и не загруженные работодатели."""
+
+    shard_id: int
+    counts: Dict[str, int]
+    vacancies: int
+    seconds: float
+    failed: List[str]
+    pages: Dict[str, int]
+
+
+def ingest_shard(task: ShardTask, queries_manager: DBQueries | None = None) -> ShardResult:
+    """Загружает шард работодателей конвейером IngestPipeline на собственном подключении и планировщике.
+
+    Выполняется в процессе пула; queries_manager передаётся только при загрузке в процессе координатора.
+    """
+    started = time.perf_counter()
+    own_queries = queries_manager is None
+    if own_queries:
+        kwargs = {"path": task.db_path} if task.db_path else {}
+        queries_manager = DBQueries(create_connection(task.backend, **kwargs))
+    # Лимит частоты hh.ru делится между процессами поровну
+    cache = None if os.environ.get("HH_CACHE_DISABLED") else ResponseCache()
+    scheduler = RequestScheduler(session=get_session(), rate=task.rate, cache=cache)
+    archive = SnapshotArchive(task.snapshot_root, task.snapshot_run_id) if task.snapshot_run_id else None
+    fetcher = VacancyFetcher(scheduler=scheduler, api_url=task.api_url, archive=archive)
+    pipeline = IngestPipeline(queries_manager, fetcher=fetcher, batch_size=task.batch_size)
+    try:
+        counts = pipeline.run(task.employer_ids)
+    finally:
+        if cache is not None:
+            cache.close()
+        if own_queries:
+            queries_manager.close()
+    return ShardResult(
+        task.shard_id,
+        counts,
+        pipeline.write_stats.items,
+        time.perf_counter() - started,
+        sorted(map(str, fetcher.failed)),
+        fetcher.last_run.pages if fetcher.last_run is not None else {},
+    )
+
+
+class ShardCoordinator:
+    """Параллельная загрузка большого набора работодателей шардами в пуле процессов.
+
+    Каждый процесс загружает и записывает свой шард на собственном подключении к базе.
+    Координатор сохраняет прогресс шардов в файл состояния (state_path) после каждого
+    шарда, повторяет неудачные шарды до max_attempts раз (только не загруженных
+    работодателей) и считает суммарную пропускную способность. Прерванную загрузку
+    того же набора работодателей можно продолжить с resume=True.
+    """
+
+    def __init__(
+        self,
+        queries_manager: DBQueries,
+        workers: int | None = None,
+        shard_size: int = 50,
+        batch_size: int = 5000,
+        max_attempts: int = 3,
+        state_path: str | None = None,
+        archive: SnapshotArchive | None = None,
+        api_url: str | None = None,
+        rate: float | None = None,
+    ):
+        """Инициализирует координатор; backend и файл базы берутся из пула queries_manager."""
+        self.queries_manager = queries_manager
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.state_path = state_path or os.path.join(".cache", "ingest_shards.json")
+        self.archive = archive
+        self.api_url = api_url or API_URL
+        self.rate = rate if rate is not None else float(os.environ.get("HH_RATE_LIMIT", "10"))
+        self.state: Dict[str, Any] = {}
+        self.counts: Dict[str, int] = {}
+        self.written = 0
+        self.elapsed = 0.0
+
+    def _plan(self, employer_ids: List[str], resume: bool) -> None:
+        """Загружает состояние прерванной загрузки того же набора или делит набор на шарды заново."""
+        if resume and os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as file:
+                state = json.load(file)
+            if state.get("employer_ids") == employer_ids:
+                if self.archive is None:
+                    # Снимки отключены: прогон из файла состояния не продолжается
+                    state["snapshot_run_id"] = state["snapshot_started_at"] = None
+                self.state = state
+                return
+            print("Набор работодателей изменился, загрузка начинается заново")
+        run = self.archive.start_run(employer_ids, self.api_url) if self.archive is not None else None
+        self.state = {
+            "employer_ids": employer_ids,
+            "snapshot_run_id": run.run_id if run is not None else None,
+            # Время начала прогона сохраняется для манифеста, в том числе после --resume
+            "snapshot_started_at": run.started_at if run is not None else None,
+            "shards": {
+                str(index): {
+                    "employer_ids": employer_ids[start : start + self.shard_size],
+                    "pending": employer_ids[start : start + self.shard_size],
+                    "status": "pending",
+                    "attempts": 0,
+                    "counts": dict.fromkeys(COUNT_KEYS, 0),
+                    "vacancies": 0,
+                    "seconds": 0.0,
+                    "pages": {},
+                    "error": None,
+                }
+                for index, start in enumerate(range(0, len(employer_ids), self.shard_size))
+            },
+        }
+
+    def _save_state(self) -> None:
+        """Атомарно записывает файл состояния."""
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        partial = f"{self.state_path}.part"
+        with open(partial, "w", encoding="utf-8") as file:
+            json.dump(self.state, file, ensure_ascii=False)
+        os.replace(partial, self.state_path)
+
+    def _task(self, shard_id: str, workers: int) -> ShardTask:
+        """Задание для шарда: ещё не загруженные работодатели и доля лимита частоты."""
+        db_connection = self.queries_manager.db_connection
+        return ShardTask(
+            int(shard_id),
+            self.state["shards"][shard_id]["pending"],
+            self.queries_manager.dialect.name,
+            getattr(db_connection, "path", None),
+            self.api_url,
+            self.rate / workers,
+            self.batch_size,
+            self.archive.root if self.archive is not None else None,
+            self.state["snapshot_run_id"],
+        )
+
+    def _record(self, shard_id: str, result: ShardResult | None, error: BaseException | None) -> bool:
+        """Учитывает итог попытки шарда; возвращает True, если шард нужно повторить."""
+        shard = self.state["shards"][shard_id]
+        shard["attempts"] += 1
+        if error is not None:
+            shard["error"] = f"{type(error).__name__}: {error}"
+        else:
+            for key in COUNT_KEYS:
+                shard["counts"][key] += result.counts.get(key, 0)
+            shard["vacancies"] += result.vacancies
+            shard["seconds"] += result.seconds
+            shard["pages"].update(result.pages)
+            self.written += result.vacancies
+            shard["pending"] = result.failed
+            shard["error"] = None if not result.failed else f"не загружены работодатели {', '.join(result.failed)}"
+            REGISTRY.observe("ingest_shard_seconds", result.seconds)
+        shard["status"] = "done" if error is None and not shard["pending"] else "failed"
+        self._save_state()
+
+        done = sum(1 for item in self.state["shards"].values() if item["status"] == "done")
+        status = "загружен" if shard["status"] == "done" else f"ошибка ({shard['error']})"
+        print(
+            f"Шард {shard_id} ({done}/{len(self.state['shards'])}): {status}, попытка {shard['attempts']}, "
+            f"вакансий {shard['vacancies']} за {shard['seconds']:.2f} с"
+        )
+        return shard["status"] == "failed" and shard["attempts"] < self.max_attempts
+
+    def _run_in_process(self, shard_ids: List[str]) -> None:
+        """Загружает шарды по очереди в процессе координатора (бэкенды без записи из нескольких процессов)."""
+        queue = list(shard_ids)
+        while queue:
+            shard_id = queue.pop(0)
+            try:
+                result, error = ingest_shard(self._task(shard_id, 1), self.queries_manager), None
+            except Exception as e:
+                result, error = None, e
+            if self._record(shard_id, result, error):
+                queue.append(shard_id)
+
+    def _run_pool(self, shard_ids: List[str], workers: int) -> None:
+        """Загружает шарды в пуле процессов; неудачные шарды ставятся в очередь повторно."""
+        # spawn: дочерние процессы не наследуют открытые подключения к базе и HTTP-сессии
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {
+                executor.submit(ingest_shard, self._task(shard_id, workers)): shard_id for shard_id in shard_ids
+            }
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard_id = futures.pop(future)
+                    try:
+                        result, error = future.result(), None
+                    except Exception as e:
+                        result, error = None, e
+                    if self._record(shard_id, result, error):
+                        futures[executor.submit(ingest_shard, self._task(shard_id, workers))] = shard_id
+
+    def run(self, employer_ids: List[str], resume: bool = False) -> Dict[str, int]:
+        """Загружает вакансии работодателей шардами и возвращает суммарные счётчики синхронизации.
+
+        С resume=True уже загруженные шарды прерванной загрузки того же набора пропускаются.
+        """
+        started = time.perf_counter()
+        self.written = 0
+        employer_ids = [str(employer_id) for employer_id in employer_ids]
+        self._plan(employer_ids, resume)
+        shard_ids = [shard_id for shard_id, shard in self.state["shards"].items() if shard["status"] != "done"]
+        for shard_id in shard_ids:
+            self.state["shards"][shard_id]["attempts"] = 0
+        self._save_state()
+
+        workers = min(self.workers, len(shard_ids))
+        if shard_ids:
+            if workers > 1 and self.queries_manager.dialect.multiprocess_writes:
+                self._run_pool(shard_ids, workers)
+            else:
+                self._run_in_process(shard_ids)
+
+        shards = self.state["shards"].values()
+        self.counts = {key: sum(shard["counts"][key] for shard in shards) for key in COUNT_KEYS}
+        failed = {employer_id for shard in shards if shard["status"] != "done" for employer_id in shard["pending"]}
+        if self.archive is not None and self.state["snapshot_run_id"] is not None:
+            run = SnapshotRun(
+                os.path.join(self.archive.root, self.state["snapshot_run_id"]),
+                self.state["snapshot_run_id"],
+                employer_ids,
+                self.api_url,
+                started_at=self.state.get("snapshot_started_at"),
+                archive=self.archive,
+            )
+            for shard in shards:
+                run.pages.update(shard["pages"])
+            run.finish(failed)
+        # Процессы пула увеличили поколение данных в базе; кэш координатора сбрасывается сразу
+        bump_generation()
+
+        self.elapsed = time.perf_counter() - started
+        for status in ("done", "failed"):
+            REGISTRY.set("ingest_shards", sum(1 for shard in shards if shard["status"] == status), {"status": status})
+        REGISTRY.set("ingest_last_run_seconds", self.elapsed)
+        return self.counts
+
+    def report(self) -> str:
+        """Возвращает отчёт о шардах и суммарной пропускной способности последнего запуска."""
+        shards = list(self.state.get("shards", {}).values())
+        done = sum(1 for shard in shards if shard["status"] == "done")
+        throughput = self.written / self.elapsed if self.elapsed else 0.0
+        lines = [
+            f"Шардов загружено: {done} из {len(shards)} (процессов: {self.workers})",
+            f"Всего: {self.written} вакансий за {self.elapsed:.2f} с ({throughput:.0f} шт./с)",
+        ]
+        failed = [employer_id for shard in shards if shard["status"] != "done" for employer_id in shard["pending"]]
+        if failed:
+            lines.append(f"Не загружены работодатели: {', '.join(failed)} (продолжить: --resume)")
+        return "\n".join(lines)
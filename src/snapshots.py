@@ -0,0 +1,211 @@
+import gzip
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+from src.get_vacancies import page_vacancies
+from src.models import Vacancy
+
+MANIFEST = "manifest.json"
+SUFFIX = ".jsonl.gz"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class SnapshotRun:
+    """Снимок одного прогона загрузки: по файлу JSONL (gzip) на работодателя и манифест.
+
+    Каждая страница дописывается в файл отдельным gzip-блоком и сразу закрывается,
+    поэтому уже записанные страницы переживают аварийное завершение. Манифест
+    появляется только у завершённого прогона. Повторная загрузка работодателя
+    в том же прогоне (например, при повторе шарда) заменяет его файл.
+    При finalize=False манифест пишет владелец общего прогона (см. SnapshotArchive).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        run_id: str,
+        employer_ids: List[str],
+        api_url: str | None = None,
+        finalize: bool = True,
+        started_at: str | None = None,
+        archive: "SnapshotArchive | None" = None,
+    ):
+        """Создаёт каталог прогона; started_at задаётся при завершении прогона, начатого другим объектом."""
+        self.directory = directory
+        self.run_id = run_id
+        self.employer_ids = [str(employer_id) for employer_id in employer_ids]
+        self.api_url = api_url
+        self.finalize = finalize
+        self.started_at = started_at or _now()
+        self.archive = archive
+        self.pages: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, employer_id: str) -> str:
+        """Файл снимка работодателя."""
+        return os.path.join(self.directory, f"{employer_id}{SUFFIX}")
+
+    def record(self, employer_id: str, page: int, payload: Dict[str, Any]) -> None:
+        """Дописывает исходный ответ API для страницы работодателя."""
+        line = json.dumps({"page": page, "payload": payload}, ensure_ascii=False, separators=(",", ":"))
+        employer_id = str(employer_id)
+        with self._lock:
+            mode = "at" if employer_id in self.pages else "wt"
+            with gzip.open(self.path(employer_id), mode, encoding="utf-8", compresslevel=6) as file:
+                file.write(line + "\n")
+            self.pages[employer_id] = self.pages.get(employer_id, 0) + 1
+
+    def finish(self, failed: set[str]) -> None:
+        """Записывает манифест: прогон завершён, failed — не полностью загруженные работодатели."""
+        if not self.finalize:
+            return
+        manifest = {
+            "run_id": self.run_id,
+            "api_url": self.api_url,
+            "started_at": self.started_at,
+            "finished_at": _now(),
+            "employer_ids": self.employer_ids,
+            "failed": sorted(str(employer_id) for employer_id in failed),
+            "pages": self.pages,
+        }
+        partial = os.path.join(self.directory, f"{MANIFEST}.part")
+        with open(partial, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+        os.replace(partial, os.path.join(self.directory, MANIFEST))
+        if self.archive is not None and self.archive.keep is not None:
+            self.archive.prune()
+
+
+class SnapshotArchive:
+    """Архив снимков в каталоге root (по умолчанию переменная окружения HH_SNAPSHOT_DIR или snapshots).
+
+    Каждый прогон лежит в своём каталоге; имена прогонов упорядочены по времени запуска.
+    С shared_run_id все загрузки пишут в один общий прогон (так шарды разных процессов
+    пишут в снимок координатора), а манифест оставляется его владельцу.
+    С keep после каждого завершённого прогона в архиве остаются только keep последних (см. prune).
+    """
+
+    def __init__(self, root: str | None = None, shared_run_id: str | None = None, keep: int | None = None):
+        """Инициализирует архив."""
+        if keep is not None and keep < 1:
+            raise ValueError(f"Число хранимых снимков должно быть не меньше 1: {keep}")
+        self.root = root or os.environ.get("HH_SNAPSHOT_DIR", "snapshots")
+        self.shared_run_id = shared_run_id
+        self.keep = keep
+
+    def start_run(self, employer_ids: List[str], api_url: str | None = None) -> SnapshotRun:
+        """Начинает новый прогон (или присоединяется к общему)."""
+        if self.shared_run_id is not None:
+            directory = os.path.join(self.root, self.shared_run_id)
+            return SnapshotRun(directory, self.shared_run_id, employer_ids, api_url, finalize=False)
+        run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}Z-{uuid.uuid4().hex[:6]}"
+        return SnapshotRun(os.path.join(self.root, run_id), run_id, employer_ids, api_url, archive=self)
+
+    def runs(self, complete_only: bool = True) -> List[str]:
+        """Прогоны архива от старых к новым; по умолчанию только завершённые (с манифестом)."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name
+            for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name))
+            and (not complete_only or os.path.exists(os.path.join(self.root, name, MANIFEST)))
+        )
+
+    def prune(self, keep: int | None = None) -> List[str]:
+        """Удаляет прогоны старше keep последних завершённых и возвращает их имена.
+
+        Незавершённые прогоны новее самого старого из оставленных (возможно, ещё идущие) не удаляются.
+        """
+        keep = keep if keep is not None else self.keep
+        complete = self.runs()
+        if keep is None or len(complete) <= keep:
+            return []
+        oldest_kept = complete[-keep]
+        removed = [name for name in self.runs(complete_only=False) if name < oldest_kept]
+        for name in removed:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        return removed
+
+    def resolve(self, run_id: str = "latest") -> str:
+        """Имя прогона; "latest" — последний завершённый."""
+        if run_id == "latest":
+            runs = self.runs()
+            if not runs:
+                raise FileNotFoundError(f"В архиве {self.root} нет завершённых снимков")
+            return runs[-1]
+        if not os.path.isdir(os.path.join(self.root, run_id)):
+            raise FileNotFoundError(f"Снимок {run_id} не найден в {self.root}")
+        return run_id
+
+    def manifest(self, run_id: str) -> Dict[str, Any] | None:
+        """Манифест прогона или None, если прогон не был завершён."""
+        path = os.path.join(self.root, run_id, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def read_pages(self, run_id: str, employer_id: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Выдаёт (номер страницы, исходный ответ API) из снимка работодателя в порядке записи."""
+        with gzip.open(os.path.join(self.root, run_id, f"{employer_id}{SUFFIX}"), "rt", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                yield entry["page"], entry["payload"]
+
+
+class SnapshotFetcher:
+    """Загрузчик с интерфейсом VacancyFetcher, читающий страницы из снимка без обращения к сети.
+
+    Повторяет загрузку прогона в точности: работодатели, не загруженные полностью
+    в исходном прогоне (или отсутствующие в снимке), считаются неудачными, и их
+    вакансии не удаляются. Снимок без манифеста (прерванный прогон) целиком считается неполным.
+    """
+
+    def __init__(self, run_id: str = "latest", archive: SnapshotArchive | None = None):
+        """Открывает снимок run_id ("latest" — последний завершённый)."""
+        self.archive = archive or SnapshotArchive()
+        self.run_id = self.archive.resolve(run_id)
+        self.manifest = self.archive.manifest(self.run_id)
+        self.failed: set[str] = set()
+
+    @property
+    def employer_ids(self) -> List[str]:
+        """Работодатели исходного прогона."""
+        if self.manifest is not None:
+            return list(self.manifest["employer_ids"])
+        directory = os.path.join(self.archive.root, self.run_id)
+        return sorted(name[: -len(SUFFIX)] for name in os.listdir(directory) if name.endswith(SUFFIX))
+
+    def iter_pages(
+        self, employer_ids: List[str], as_records: bool = False
+    ) -> Iterator[Tuple[str, int, List[Dict[str, Any]] | List[Vacancy]]]:
+        """Выдаёт (ID работодателя, номер страницы, валидные вакансии) из снимка, как VacancyFetcher.iter_pages."""
+        failed = set(self.manifest["failed"]) if self.manifest is not None else set(map(str, employer_ids))
+        self.failed = {employer_id for employer_id in employer_ids if str(employer_id) in failed}
+        for employer_id in employer_ids:
+            try:
+                for page, payload in self.archive.read_pages(self.run_id, str(employer_id)):
+                    yield employer_id, page, page_vacancies(payload, as_records)
+            except FileNotFoundError:
+                print(f"В снимке {self.run_id} нет вакансий работодателя с ID {employer_id}")
+                self.failed.add(employer_id)
+
+    def fetch_all(self, employer_ids: List[str]) -> List[Dict[str, Any]]:
+        """Все вакансии работодателей из снимка в порядке работодателей и страниц."""
+        pages = {}
+        for employer_id, page, vacancies in self.iter_pages(employer_ids):
+            pages[(employer_id, page)] = vacancies
+        order = {employer_id: index for index, employer_id in enumerate(employer_ids)}
+        return [
+            vacancy for key in sorted(pages, key=lambda item: (order[item[0]], item[1])) for vacancy in pages[key]
+        ]